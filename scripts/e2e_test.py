@@ -5,18 +5,22 @@ Run without pytest from any environment to verify the full pipeline works
 """
 
 import asyncio
-import json
+import atexit
+import contextlib
 import os
+import select
 import sys
 import time
+from collections.abc import Awaitable
 
 try:
     import httpx
+    import orjson
     import pika
     from sqlalchemy import create_engine, text
 except ImportError as e:
     print(f"Error: Missing required package: {e}")
-    print("Install with: pip install httpx pika sqlalchemy psycopg")
+    print("Install with: pip install httpx orjson pika sqlalchemy psycopg")
     sys.exit(1)
 
 # ========================
@@ -35,6 +39,37 @@ POSTGRES_USER = os.getenv("POSTGRES_USER", "weather_user")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "weather_password")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "weather_db")
 
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+
+# Channel notified by the weather_records insert trigger (see alembic migrations)
+NOTIFY_CHANNEL = "weather_inserted"
+PIPELINE_TIMEOUT = 60
+
+DATABASE_URL = (
+    f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}"
+    f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+)
+
+# Shared HTTP client so repeated probes reuse pooled connections
+_HTTP_CLIENT = httpx.AsyncClient(timeout=5, limits=httpx.Limits(max_keepalive_connections=10))
+
+# Shared engine for the health check and the pipeline polling loop
+_PG_ENGINE = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=2,
+    connect_args={"connect_timeout": int(HEALTH_CHECK_TIMEOUT)},
+)
+atexit.register(_PG_ENGINE.dispose)
+
+# Built once so SQLAlchemy's compiled-statement cache is hit on every poll
+_RECORD_LOOKUP = text(
+    "SELECT id, temp_c, humidity FROM weather_records WHERE localtime_epoch = :epoch"
+)
+
+# Shared RabbitMQ connection, opened by the health check and reused for publishing
+_RMQ_CONNECTION: pika.BlockingConnection | None = None
+
 # Colors for output
 GREEN = "\033[92m"
 RED = "\033[91m"
@@ -79,13 +114,36 @@ def print_info(text: str):
 # ========================
 
 
+def get_rmq_connection(connection_attempts: int = 1) -> pika.BlockingConnection:
+    """Return the shared RabbitMQ connection, (re)opening it if needed"""
+    global _RMQ_CONNECTION
+    if _RMQ_CONNECTION is None or not _RMQ_CONNECTION.is_open:
+        _RMQ_CONNECTION = pika.BlockingConnection(
+            pika.ConnectionParameters(
+                RABBIT_HOST,
+                RABBIT_PORT,
+                # A blocking connection only services heartbeats inside pika calls,
+                # and this one sits idle while the checks wait on the API and database
+                heartbeat=0,
+                connection_attempts=connection_attempts,
+            )
+        )
+    return _RMQ_CONNECTION
+
+
+def close_rmq_connection() -> None:
+    """Close the shared RabbitMQ connection if it is open"""
+    global _RMQ_CONNECTION
+    if _RMQ_CONNECTION is not None and _RMQ_CONNECTION.is_open:
+        _RMQ_CONNECTION.close()
+    _RMQ_CONNECTION = None
+
+
 def check_rabbitmq_health() -> bool:
     """Check if RabbitMQ is healthy"""
     try:
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(RABBIT_HOST, RABBIT_PORT, heartbeat=5, connection_attempts=1)
-        )
-        connection.close()
+        # Left open so the pipeline test can publish without a second handshake
+        get_rmq_connection()
         print_success(f"RabbitMQ healthy ({RABBIT_HOST}:{RABBIT_PORT})")
         return True
     except Exception as e:
@@ -96,14 +154,13 @@ def check_rabbitmq_health() -> bool:
 async def check_api_health() -> bool:
     """Check if API is healthy"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{API_URL}/health", timeout=5)
-            if response.status_code == 200:
-                print_success(f"API healthy ({API_URL})")
-                return True
-            else:
-                print_error(f"API returned status {response.status_code}")
-                return False
+        response = await _HTTP_CLIENT.get(f"{API_URL}/health")
+        if response.status_code == 200:
+            print_success(f"API healthy ({API_URL})")
+            return True
+        else:
+            print_error(f"API returned status {response.status_code}")
+            return False
     except Exception as e:
         print_error(f"API unreachable: {e}")
         return False
@@ -112,13 +169,8 @@ async def check_api_health() -> bool:
 def check_postgres_health() -> bool:
     """Check if PostgreSQL is healthy"""
     try:
-        engine = create_engine(
-            f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}",
-            pool_pre_ping=True,
-        )
-        with engine.connect() as conn:
+        with _PG_ENGINE.connect() as conn:
             conn.execute(text("SELECT 1"))
-        engine.dispose()
         print_success(f"PostgreSQL healthy ({POSTGRES_HOST}:{POSTGRES_PORT})")
         return True
     except Exception as e:
@@ -129,19 +181,27 @@ def check_postgres_health() -> bool:
 async def check_metabase_health() -> bool:
     """Check if Metabase is healthy (optional)"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(METABASE_URL, timeout=5)
-            if response.status_code in [200, 302, 404]:
-                print_success(f"Metabase healthy ({METABASE_URL})")
-                return True
-            else:
-                print_warning(f"Metabase returned status {response.status_code}")
-                return False
+        response = await _HTTP_CLIENT.get(METABASE_URL)
+        if response.status_code in [200, 302, 404]:
+            print_success(f"Metabase healthy ({METABASE_URL})")
+            return True
+        else:
+            print_warning(f"Metabase returned status {response.status_code}")
+            return False
     except Exception as e:
         print_warning(f"Metabase not running (optional): {e}")
         return False
 
 
+async def with_timeout(name: str, check: Awaitable[bool]) -> bool:
+    """Bound a health check by HEALTH_CHECK_TIMEOUT seconds"""
+    try:
+        return await asyncio.wait_for(check, timeout=HEALTH_CHECK_TIMEOUT)
+    except TimeoutError:
+        print_error(f"{name} health check timed out after {HEALTH_CHECK_TIMEOUT}s")
+        return False
+
+
 # ========================
 # Test Data
 # ========================
@@ -208,72 +268,129 @@ def get_test_weather_message() -> dict:
 # ========================
 
 
-async def test_pipeline() -> bool:
-    """Test the full pipeline"""
-    test_message = get_test_weather_message()
-    localtime_epoch = test_message["location"]["localtime_epoch"]
+def open_listen_connection():
+    """
+    Open a dedicated autocommit connection subscribed to NOTIFY_CHANNEL.
 
-    print_header("Publishing Test Message to RabbitMQ")
+    Returns None if LISTEN cannot be set up, in which case callers fall back
+    to exponential backoff polling.
+    """
     try:
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(RABBIT_HOST, RABBIT_PORT, heartbeat=5, connection_attempts=3)
-        )
-        channel = connection.channel()
+        raw = _PG_ENGINE.raw_connection()
+        # Keep this connection out of the pool; it is closed after the wait
+        raw.detach()
+        listen_conn = raw.dbapi_connection
+        listen_conn.autocommit = True
+        with listen_conn.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return listen_conn
+    except Exception as e:
+        print_warning(f"LISTEN unavailable, falling back to polling: {e}")
+        return None
+
+
+def wait_for_notification(listen_conn, timeout: float) -> bool:
+    """Block until a notification arrives on listen_conn or timeout elapses"""
+    ready, _, _ = select.select([listen_conn], [], [], timeout)
+    if not ready:
+        return False
+    listen_conn.poll()
+    notified = bool(listen_conn.notifies)
+    listen_conn.notifies.clear()
+    return notified
+
+
+def publish_test_message(test_message: dict) -> bool:
+    """Publish the test message to RabbitMQ over the shared connection"""
+    try:
+        channel = get_rmq_connection(connection_attempts=3).channel()
         channel.queue_declare(queue=QUEUE_NAME)
-        channel.basic_publish(exchange="", routing_key=QUEUE_NAME, body=json.dumps(test_message))
-        connection.close()
+        channel.basic_publish(exchange="", routing_key=QUEUE_NAME, body=orjson.dumps(test_message))
+        channel.close()
         print_success(f"Message published to queue '{QUEUE_NAME}'")
+        return True
     except Exception as e:
         print_error(f"Failed to publish message: {e}")
         return False
 
-    print_header("Waiting for Message Processing")
-    print_info("Waiting for consumer to process message and API to create record...")
-    print_info("(checking database every 1 second for up to 60 seconds)")
 
-    # Poll database for record
-    engine = create_engine(
-        f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}",
-        pool_pre_ping=True,
-    )
+async def wait_for_record(localtime_epoch: int, listen_conn) -> bool:
+    """Wait for the weather record with localtime_epoch to appear in the database"""
+    lookup_params = {"epoch": localtime_epoch}
+    deadline = time.monotonic() + PIPELINE_TIMEOUT
+    delay = 0.1
+    attempt = 0
 
-    for attempt in range(60):
-        try:
-            with engine.connect() as conn:
-                result = conn.execute(
-                    text(
-                        "SELECT id, temp_c, humidity FROM weather_records "
-                        "WHERE localtime_epoch = :epoch"
-                    ),
-                    {"epoch": localtime_epoch},
-                )
+    # Look the record up, then sleep until notified (or backoff elapses) and look again
+    try:
+        with _PG_ENGINE.connect() as conn:
+            while True:
+                result = conn.execute(_RECORD_LOOKUP, lookup_params)
                 row = result.fetchone()
+                # End the implicit transaction so the next attempt sees new commits
+                conn.rollback()
                 if row:
                     record_id, temp_c, humidity = row
                     print_success(f"Record created in database (ID: {record_id})")
                     print_info(f"  Temperature: {temp_c}°C")
                     print_info(f"  Humidity: {humidity}%")
-                    engine.dispose()
                     return True
-        except Exception as e:
-            print_error(f"Database query failed: {e}")
-            engine.dispose()
-            return False
 
-        await asyncio.sleep(1)
-        print_info(f"Attempt {attempt + 1}/60 - waiting...")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                attempt += 1
+                timeout = min(delay, remaining)
+                if listen_conn is not None:
+                    notified = await asyncio.to_thread(wait_for_notification, listen_conn, timeout)
+                else:
+                    await asyncio.sleep(timeout)
+                    notified = False
+                if not notified:
+                    delay = min(delay * 2, 1.0)
+                    print_info(f"Attempt {attempt} - waiting...")
+    except Exception as e:
+        print_error(f"Database query failed: {e}")
+        return False
 
-    print_error("Record not created in database after 60 seconds")
-    engine.dispose()
+    print_error(f"Record not created in database after {PIPELINE_TIMEOUT} seconds")
     return False
 
 
+async def test_pipeline() -> bool:
+    """Test the full pipeline"""
+    test_message = get_test_weather_message()
+    localtime_epoch = test_message["location"]["localtime_epoch"]
+
+    print_header("Publishing Test Message and Waiting for Processing")
+    print_info("Waiting for consumer to process message and API to create record...")
+    print_info(
+        f"(listening for '{NOTIFY_CHANNEL}' notifications for up to {PIPELINE_TIMEOUT} seconds)"
+    )
+
+    # LISTEN before publishing so a fast consumer's notification can't be missed
+    listen_conn = open_listen_connection()
+    try:
+        # Start watching the database while the publish is still in flight
+        wait_task = asyncio.create_task(wait_for_record(localtime_epoch, listen_conn))
+        if not await asyncio.to_thread(publish_test_message, test_message):
+            wait_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await wait_task
+            return False
+        return await wait_task
+    finally:
+        if listen_conn is not None:
+            listen_conn.close()
+
+
 # ========================
 # Main
 # ========================
 
 
-async def main():
+async def run_checks() -> bool:
     """Run all checks"""
     print(f"\n{BOLD}Weather Pipeline E2E Test{RESET}")
     print("Testing pipeline: RabbitMQ → Consumer → API → PostgreSQL")
@@ -285,18 +402,17 @@ async def main():
 
     print_header("Phase 1: Service Health Checks")
 
-    all_healthy = True
-
-    if not check_rabbitmq_health():
-        all_healthy = False
-
-    if not await check_api_health():
-        all_healthy = False
-
-    if not check_postgres_health():
-        all_healthy = False
+    # Run all checks concurrently; blocking pika/SQLAlchemy probes go to worker threads
+    results = await asyncio.gather(
+        with_timeout("RabbitMQ", asyncio.to_thread(check_rabbitmq_health)),
+        with_timeout("API", check_api_health()),
+        with_timeout("PostgreSQL", asyncio.to_thread(check_postgres_health)),
+        with_timeout("Metabase", check_metabase_health()),  # Optional - don't fail if missing
+        return_exceptions=True,
+    )
 
-    await check_metabase_health()  # Optional - don't fail if missing
+    # Exceptions are truthy, so compare against True explicitly
+    all_healthy = all(result is True for result in results[:3])
 
     if not all_healthy:
         print_error("\nCritical services not healthy. Aborting pipeline test.")
@@ -329,6 +445,17 @@ async def main():
         return False
 
 
+async def main() -> bool:
+    """Run all checks and release shared connections"""
+    try:
+        return await run_checks()
+    finally:
+        await _HTTP_CLIENT.aclose()
+        # The broker may already have dropped the connection; that must not mask the result
+        with contextlib.suppress(pika.exceptions.AMQPError):
+            close_rmq_connection()
+
+
 if __name__ == "__main__":
     try:
         success = asyncio.run(main())
@@ -0,0 +1,41 @@
+"""notify on weather record insert
+
+Revision ID: 42ad034a4572
+Revises: 840dc0f71a0e
+Create Date: 2025-11-24 10:12:03.418529
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "42ad034a4572"
+down_revision = "840dc0f71a0e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Publish the localtime_epoch of each new row so waiters can LISTEN instead of polling
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_weather_inserted() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('weather_inserted', NEW.localtime_epoch::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER weather_records_notify_insert
+        AFTER INSERT ON weather_records
+        FOR EACH ROW EXECUTE FUNCTION notify_weather_inserted()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS weather_records_notify_insert ON weather_records")
+    op.execute("DROP FUNCTION IF EXISTS notify_weather_inserted()")
@@ -0,0 +1,32 @@
+"""add location name trigram index
+
+Revision ID: 5f0c8e2a7d41
+Revises: d2e84f6a1b09
+Create Date: 2025-11-25 09:21:36.550182
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5f0c8e2a7d41"
+down_revision = "d2e84f6a1b09"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Location search uses ILIKE '%term%', which a btree index cannot serve
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "idx_location_name_trgm",
+        "locations",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_location_name_trgm", table_name="locations")
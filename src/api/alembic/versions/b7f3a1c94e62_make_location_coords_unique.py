@@ -0,0 +1,46 @@
+"""make location coords unique
+
+Revision ID: b7f3a1c94e62
+Revises: 9c1e5b7d2f30
+Create Date: 2025-11-24 14:38:12.604871
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7f3a1c94e62"
+down_revision = "9c1e5b7d2f30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ON CONFLICT (lat, lon) needs a unique index to arbitrate against
+    # Concurrent get-or-creates could insert the same coordinates twice; keep the
+    # oldest location per (lat, lon), move its duplicates' records onto it, then
+    # delete the duplicates so the unique index can be built
+    op.execute(
+        """
+        UPDATE weather_records
+        SET location_id = keep.id
+        FROM locations duplicate
+        JOIN (SELECT lat, lon, min(id) AS id FROM locations GROUP BY lat, lon) keep
+            ON (keep.lat, keep.lon) = (duplicate.lat, duplicate.lon)
+        WHERE weather_records.location_id = duplicate.id AND duplicate.id <> keep.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM locations duplicate
+        USING locations keep
+        WHERE (duplicate.lat, duplicate.lon) = (keep.lat, keep.lon) AND duplicate.id > keep.id
+        """
+    )
+    op.drop_index("idx_location_coords", table_name="locations")
+    op.create_index("idx_location_coords", "locations", ["lat", "lon"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_location_coords", table_name="locations")
+    op.create_index("idx_location_coords", "locations", ["lat", "lon"], unique=False)
@@ -0,0 +1,47 @@
+"""make weather upsert index unique
+
+Revision ID: d2e84f6a1b09
+Revises: b7f3a1c94e62
+Create Date: 2025-11-24 15:02:51.173940
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d2e84f6a1b09"
+down_revision = "b7f3a1c94e62"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ON CONFLICT (location_id, condition_id, localtime_epoch) needs a unique index
+    # Redelivered messages (and locations merged by b7f3a1c94e62) can have left several
+    # rows per key; keep only the most recently updated one
+    op.execute(
+        """
+        DELETE FROM weather_records stale
+        USING weather_records newer
+        WHERE (stale.location_id, stale.condition_id, stale.localtime_epoch)
+              = (newer.location_id, newer.condition_id, newer.localtime_epoch)
+          AND (stale.updated_at, stale.id) < (newer.updated_at, newer.id)
+        """
+    )
+    op.drop_index("idx_weather_upsert", table_name="weather_records")
+    op.create_index(
+        "idx_weather_upsert",
+        "weather_records",
+        ["location_id", "condition_id", "localtime_epoch"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_weather_upsert", table_name="weather_records")
+    op.create_index(
+        "idx_weather_upsert",
+        "weather_records",
+        ["location_id", "condition_id", "localtime_epoch"],
+        unique=False,
+    )
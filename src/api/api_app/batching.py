@@ -0,0 +1,173 @@
+"""Asynchronous batching of weather record writes."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+from loguru import logger
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas
+from .config import settings
+from .database import SessionLocal
+
+
+class WeatherRecordBatcher:
+    """
+    Coalesce concurrent weather record writes into set-oriented batches.
+
+    Each request enqueues its payload and awaits a future. While a batch is
+    being written, newly arriving payloads accumulate; when the write
+    finishes, everything pending (up to max_batch_size) goes out as the next
+    batch. A lone request is written immediately, so batching only kicks in
+    under concurrent load and adds no latency otherwise.
+    """
+
+    def __init__(
+        self, session_factory: Callable[[], AsyncSession], max_batch_size: int = 50
+    ) -> None:
+        """
+        Initialize the batcher.
+
+        Args:
+            session_factory: Callable returning a database session for one batch
+            max_batch_size: Maximum number of payloads written per batch
+        """
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self._pending: list[
+            tuple[schemas.WeatherRecordCreate, asyncio.Future[models.WeatherRecord]]
+        ] = []
+        self._drain_task: asyncio.Task[None] | None = None
+
+    async def submit(self, weather_data: schemas.WeatherRecordCreate) -> models.WeatherRecord:
+        """
+        Queue a weather payload for writing and wait for its record.
+
+        Args:
+            weather_data: Weather observation with location and current conditions
+
+        Returns:
+            Created or updated WeatherRecord
+
+        Raises:
+            Exception: On database errors for this payload
+        """
+        future: asyncio.Future[models.WeatherRecord] = asyncio.get_running_loop().create_future()
+        self._pending.append((weather_data, future))
+
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain())
+
+        return await future
+
+    async def _drain(self) -> None:
+        """Write pending payloads batch by batch until none are left."""
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            await self._write_batch(batch)
+
+    async def _write_batch(
+        self, batch: list[tuple[schemas.WeatherRecordCreate, asyncio.Future[models.WeatherRecord]]]
+    ) -> None:
+        """Write one batch and resolve its futures."""
+        payloads = [data for data, _ in batch]
+        try:
+            db: AsyncSession = self.session_factory()
+            try:
+                results = await write_weather_records(db, payloads)
+            finally:
+                await db.close()
+        except Exception as session_error:
+            results = [session_error] * len(batch)
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if isinstance(result, Exception):
+                _set_exception(future, result)
+            else:
+                _set_result(future, result)
+
+
+# SQLSTATE classes for data exceptions and integrity constraint violations
+_RECORD_ERROR_CLASSES: frozenset[str] = frozenset(("22", "23"))
+
+
+def is_record_error(error: Exception) -> bool:
+    """
+    Tell whether a write failed because of the record itself.
+
+    Data exceptions (e.g. a value out of range) and constraint violations
+    fail the same way every time; anything else, such as a lost connection,
+    may succeed on retry.
+
+    Args:
+        error: Exception raised while writing the record
+
+    Returns:
+        True if retrying the same record cannot succeed
+    """
+    sqlstate = getattr(getattr(error, "orig", None), "sqlstate", None)
+    return isinstance(error, DBAPIError) and str(sqlstate)[:2] in _RECORD_ERROR_CLASSES
+
+
+async def write_weather_records(
+    db: AsyncSession, payloads: list[schemas.WeatherRecordCreate]
+) -> list[models.WeatherRecord | Exception]:
+    """
+    Write payloads as one batch, falling back to one-by-one on failure.
+
+    The fallback means a single malformed payload only fails on its own
+    instead of taking the whole batch down with it.
+
+    Args:
+        db: Database session
+        payloads: Weather observations to upsert
+
+    Returns:
+        One record or exception per payload, in input order
+    """
+    try:
+        return await crud.create_weather_records(db, payloads)
+    except Exception as batch_error:
+        if len(payloads) == 1:
+            return [batch_error]
+        logger.warning("Batch of {} failed, retrying records individually", len(payloads))
+
+    results: list[models.WeatherRecord | Exception] = []
+    for weather_data in payloads:
+        try:
+            results.append(await crud.create_weather_record(db, weather_data))
+            # Detach what is stored so a later record's rollback doesn't expire it
+            db.expunge_all()
+        except Exception as record_error:
+            results.append(record_error)
+    return results
+
+
+def _set_result(future: asyncio.Future[Any], result: Any) -> None:
+    """Resolve a future unless its request was cancelled."""
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future[Any], error: Exception) -> None:
+    """Fail a future unless its request was cancelled."""
+    if not future.done():
+        future.set_exception(error)
+
+
+batcher = WeatherRecordBatcher(SessionLocal, max_batch_size=settings.INGEST_BATCH_SIZE)
+
+
+def get_batcher() -> WeatherRecordBatcher:
+    """
+    Dependency to get the shared weather record batcher.
+
+    Returns:
+        Process-wide WeatherRecordBatcher
+    """
+    return batcher
@@ -2,22 +2,65 @@
 
 from __future__ import annotations
 
+import base64
+import json
+import time
+from collections.abc import Iterable
+from datetime import datetime
 from typing import Any
 
 from loguru import logger
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
-
-from . import models
-
-
-def get_or_create_location(db: Session, location_data: dict[str, Any]) -> models.Location:
+from sqlalchemy import Select, desc, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import models, schemas
+
+# Columns of idx_weather_upsert, the arbiter for weather record upserts
+_WEATHER_UPSERT_KEY: tuple[str, ...] = ("location_id", "condition_id", "localtime_epoch")
+
+# Location columns supplied by the payload (its localtime fields belong to the record)
+_LOCATION_FIELDS: frozenset[str] = frozenset(("name", "region", "country", "lat", "lon", "tz_id"))
+
+# Rows per multi-row INSERT: ~40 bind parameters each keeps a statement under the 32767 limit
+_MAX_ROWS_PER_INSERT: int = 500
+
+# Totals are recomputed at most once per window for each location filter
+_COUNT_TTL_SECONDS: int = 30
+_COUNT_CACHE_MAX_ENTRIES: int = 256
+_count_cache: dict[str | None, tuple[int, int]] = {}
+
+# Latest-record lookups by (lowercased) search term are served from memory until they expire
+_LATEST_TTL_SECONDS: float = 30.0
+_LATEST_CACHE_MAX_ENTRIES: int = 1024
+_latest_cache: dict[str, tuple[float, models.WeatherRecord | None]] = {}
+
+# Load the relations serialized with every record in the same query (both FKs are NOT NULL,
+# so inner joins are safe); avoids N+1 and the extra round-trip per relation
+_WITH_RELATIONS = (
+    joinedload(models.WeatherRecord.location, innerjoin=True),
+    joinedload(models.WeatherRecord.condition, innerjoin=True),
+)
+
+# For queries that already join locations to filter on them: reuse that join for the relation
+_WITH_JOINED_LOCATION = (
+    contains_eager(models.WeatherRecord.location),
+    joinedload(models.WeatherRecord.condition, innerjoin=True),
+)
+
+
+async def get_or_create_location(
+    db: AsyncSession, location_data: dict[str, Any]
+) -> models.Location:
     """
     Get existing location or create new one.
 
     Uses exact match on coordinates (lat, lon) to find existing locations.
-    This upsert pattern ensures duplicate locations with same coordinates
-    are not created.
+    Issues a single INSERT ... ON CONFLICT (lat, lon) DO UPDATE ... RETURNING,
+    so the lookup and insert happen in one round-trip and concurrent
+    consumers cannot create duplicate locations.
 
     Args:
         db: Database session
@@ -26,32 +69,28 @@ def get_or_create_location(db: Session, location_data: dict[str, Any]) -> models
     Returns:
         Location object (existing or newly created)
     """
-    location: models.Location | None = (
-        db.query(models.Location)
-        .filter(
-            models.Location.lat == location_data["lat"],
-            models.Location.lon == location_data["lon"],
-        )
-        .first()
-    )
-
-    if location:
-        logger.debug(f"Found existing location: {location.name}, {location.country}")
-        return location
-
-    logger.info(f"Creating new location: {location_data['name']}, {location_data['country']}")
-    location = models.Location(**location_data)
-    db.add(location)
-    db.flush()  # Get the ID without committing
+    stmt = pg_insert(models.Location).values(**location_data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Location.lat, models.Location.lon],
+        set_={"name": stmt.excluded.name},
+    ).returning(models.Location)
+
+    location: models.Location = (
+        await db.scalars(stmt, execution_options={"populate_existing": True})
+    ).one()
+    logger.debug("Upserted location: {}, {}", location.name, location.country)
     return location
 
 
-def get_or_create_condition(db: Session, condition_data: dict[str, Any]) -> models.WeatherCondition:
+async def get_or_create_condition(
+    db: AsyncSession, condition_data: dict[str, Any]
+) -> models.WeatherCondition:
     """
     Get existing weather condition or create new one.
 
     Uses exact match on condition code to find existing conditions.
-    This upsert pattern prevents duplicate condition records.
+    Issues a single INSERT ... ON CONFLICT (code) DO UPDATE ... RETURNING,
+    preventing duplicate condition records without a separate SELECT.
 
     Args:
         db: Database session
@@ -60,111 +99,156 @@ def get_or_create_condition(db: Session, condition_data: dict[str, Any]) -> mode
     Returns:
         WeatherCondition object (existing or newly created)
     """
-    condition: models.WeatherCondition | None = (
-        db.query(models.WeatherCondition)
-        .filter(models.WeatherCondition.code == condition_data["code"])
-        .first()
-    )
-
-    if condition:
-        logger.debug(f"Found existing condition: {condition.text}")
-        return condition
-
-    logger.info(f"Creating new condition: {condition_data['text']}")
-    condition = models.WeatherCondition(**condition_data)
-    db.add(condition)
-    db.flush()
+    stmt = pg_insert(models.WeatherCondition).values(**condition_data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.WeatherCondition.code],
+        set_={"text": stmt.excluded.text},
+    ).returning(models.WeatherCondition)
+
+    condition: models.WeatherCondition = (
+        await db.scalars(stmt, execution_options={"populate_existing": True})
+    ).one()
+    logger.debug("Upserted condition: {}", condition.text)
     return condition
 
 
-def create_weather_record(db: Session, weather_data: dict[str, Any]) -> models.WeatherRecord:
+async def create_weather_record(
+    db: AsyncSession, weather_data: schemas.WeatherRecordCreate
+) -> models.WeatherRecord:
     """
     Create or update a weather record (upsert pattern).
 
     Extracts location and condition information from the weather data,
     creates or retrieves related entities, then creates or updates the
-    weather record based on the composite key (location, condition, timestamp).
+    weather record based on the composite key (location, condition, timestamp)
+    with a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement.
 
     This ensures that duplicate observations (same location, condition, time)
     update the existing record rather than creating a duplicate.
 
     Args:
         db: Database session
-        weather_data: Dictionary with structure:
-            {
-                "location": {...},
-                "current": {
-                    "condition": {...},
-                    ... other fields ...
-                }
-            }
+        weather_data: Validated weather payload (location plus current with nested condition)
 
     Returns:
         Created or updated WeatherRecord
 
     Raises:
-        KeyError: If required fields are missing from input
         Exception: On database errors (logged and re-raised)
     """
-    try:
-        # Extract nested data
-        location_data_raw: dict[str, Any] = weather_data["location"].copy()
-        current_data: dict[str, Any] = weather_data["current"].copy()
-        condition_data: dict[str, Any] = current_data.pop("condition")
-
-        # Extract localtime fields from location data (they belong to weather record)
-        localtime_epoch: int = location_data_raw.pop("localtime_epoch")
-        localtime: str = location_data_raw.pop("localtime")
-
-        # Get or create related entities
-        location: models.Location = get_or_create_location(db, location_data_raw)
-        condition: models.WeatherCondition = get_or_create_condition(db, condition_data)
-
-        # Check if record already exists (same location, condition, and timestamp)
-        existing_record: models.WeatherRecord | None = (
-            db.query(models.WeatherRecord)
-            .filter(
-                models.WeatherRecord.location_id == location.id,
-                models.WeatherRecord.condition_id == condition.id,
-                models.WeatherRecord.localtime_epoch == localtime_epoch,
-            )
-            .first()
-        )
+    return (await create_weather_records(db, [weather_data]))[0]
 
-        if existing_record:
-            # Update existing record with new data
-            logger.info(f"Updating existing weather record ID: {existing_record.id}")
-            for key, value in current_data.items():
-                setattr(existing_record, key, value)
-            existing_record.localtime = localtime
-            db.commit()
-            db.refresh(existing_record)
-            logger.success(f"Updated weather record ID: {existing_record.id}")
-            return existing_record
-        else:
-            # Create new weather record
-            weather_record: models.WeatherRecord = models.WeatherRecord(
-                location_id=location.id,
-                condition_id=condition.id,
-                localtime_epoch=localtime_epoch,
-                localtime=localtime,
-                **current_data,
-            )
 
-            db.add(weather_record)
-            db.commit()
-            db.refresh(weather_record)
+async def create_weather_records(
+    db: AsyncSession, weather_data_list: list[schemas.WeatherRecordCreate]
+) -> list[models.WeatherRecord]:
+    """
+    Create or update a batch of weather records in one transaction.
+
+    Set-oriented version of create_weather_record: each distinct location and
+    condition is upserted once, then all records go out in multi-row
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING statements (one per
+    _MAX_ROWS_PER_INSERT rows) and one commit. Observations
+    sharing the same (location, condition, timestamp) collapse to the last one.
+
+    Args:
+        db: Database session
+        weather_data_list: Weather payloads, each shaped as for create_weather_record
 
-            logger.success(f"Created weather record ID: {weather_record.id}")
-            return weather_record
+    Returns:
+        Created or updated WeatherRecords, in the same order as the input
+
+    Raises:
+        Exception: On database errors (logged and re-raised)
+    """
+    if not weather_data_list:
+        return []
+
+    try:
+        locations: dict[tuple[float, float], models.Location] = {}
+        conditions: dict[int, models.WeatherCondition] = {}
+        rows: dict[tuple[int, int, int], dict[str, Any]] = {}
+        keys: list[tuple[int, int, int]] = []
+
+        for weather_data in weather_data_list:
+            location_input = weather_data.location
+            current_input = weather_data.current
+            condition_input = current_input.condition
+
+            # Extract localtime fields from location data (they belong to weather record)
+            localtime_epoch: int = location_input.localtime_epoch
+            localtime: str = location_input.localtime
+
+            # Get or create related entities, once per distinct location/condition
+            coords = (location_input.lat, location_input.lon)
+            if coords not in locations:
+                locations[coords] = await get_or_create_location(
+                    db, location_input.model_dump(include=_LOCATION_FIELDS)
+                )
+            if condition_input.code not in conditions:
+                conditions[condition_input.code] = await get_or_create_condition(
+                    db, condition_input.model_dump()
+                )
+
+            key = (
+                locations[coords].id,
+                conditions[condition_input.code].id,
+                localtime_epoch,
+            )
+            rows[key] = {
+                **current_input.model_dump(exclude={"condition"}),
+                "location_id": key[0],
+                "condition_id": key[1],
+                "localtime_epoch": localtime_epoch,
+                "localtime": localtime,
+            }
+            keys.append(key)
+
+        # Insert, or update existing rows with the same (location, condition, timestamp),
+        # in chunks that stay under the driver's bind parameter limit
+        row_list = list(rows.values())
+        updated_at = datetime.utcnow()
+        records_by_key: dict[tuple[int, int, int], models.WeatherRecord] = {}
+        for start in range(0, len(row_list), _MAX_ROWS_PER_INSERT):
+            stmt = pg_insert(models.WeatherRecord).values(
+                row_list[start : start + _MAX_ROWS_PER_INSERT]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_WEATHER_UPSERT_KEY),
+                set_={
+                    **{
+                        column: stmt.excluded[column]
+                        for column in row_list[0]
+                        if column not in _WEATHER_UPSERT_KEY
+                    },
+                    # Column.onupdate is not applied to ON CONFLICT updates
+                    "updated_at": updated_at,
+                },
+            ).returning(models.WeatherRecord)
+
+            for record in await db.scalars(stmt, execution_options={"populate_existing": True}):
+                record_key = (record.location_id, record.condition_id, record.localtime_epoch)
+                records_by_key[record_key] = record
+        await db.commit()
+
+        # Attach the already-loaded relations so serialization doesn't lazy-load them
+        locations_by_id = {location.id: location for location in locations.values()}
+        conditions_by_id = {condition.id: condition for condition in conditions.values()}
+        for record in records_by_key.values():
+            set_committed_value(record, "location", locations_by_id[record.location_id])
+            set_committed_value(record, "condition", conditions_by_id[record.condition_id])
+
+        _invalidate_caches(location.name for location in locations.values())
+        logger.success("Upserted {} weather record(s)", len(records_by_key))
+        return [records_by_key[key] for key in keys]
 
     except Exception as database_error:
-        db.rollback()
-        logger.error(f"Failed to create/update weather record: {database_error}")
+        await db.rollback()
+        logger.error("Failed to create/update weather records: {}", database_error)
         raise
 
 
-def get_weather_record(db: Session, record_id: int) -> models.WeatherRecord | None:
+async def get_weather_record(db: AsyncSession, record_id: int) -> models.WeatherRecord | None:
     """
     Get a specific weather record by ID.
 
@@ -175,59 +259,173 @@ def get_weather_record(db: Session, record_id: int) -> models.WeatherRecord | No
     Returns:
         WeatherRecord if found, None otherwise
     """
-    return db.query(models.WeatherRecord).filter(models.WeatherRecord.id == record_id).first()
+    stmt = (
+        select(models.WeatherRecord)
+        .options(*_WITH_RELATIONS)
+        .where(models.WeatherRecord.id == record_id)
+    )
+    return (await db.scalars(stmt)).first()
+
+
+def encode_cursor(record: models.WeatherRecord) -> str:
+    """
+    Encode the (created_at, id) sort key of a record as an opaque page cursor.
+
+    Args:
+        record: Last record of the current page
+
+    Returns:
+        URL-safe base64 cursor pointing just past the record
+    """
+    key = {"created_at": record.created_at.isoformat(), "id": record.id}
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a page cursor produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor from a previous page
+
+    Returns:
+        Tuple of (created_at, id) the next page starts after
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(key["created_at"]), int(key["id"])
+    except (ValueError, TypeError, KeyError) as cursor_error:
+        raise ValueError(f"Invalid cursor: {cursor}") from cursor_error
 
 
-def get_weather_records(
-    db: Session, skip: int = 0, limit: int = 100
-) -> tuple[list[models.WeatherRecord], int]:
+async def _paginate(
+    db: AsyncSession, stmt: Select[Any], cursor: str | None, limit: int
+) -> tuple[list[models.WeatherRecord], str | None]:
     """
-    Get paginated weather records ordered by creation time (newest first).
+    Fetch one page of a WeatherRecord query using keyset pagination.
+
+    Pages are ordered by (created_at, id) descending and continue strictly
+    after the cursor key, so each page is an index range scan of `limit` rows
+    no matter how deep it is. One extra row is fetched to tell whether a next
+    page exists.
 
     Args:
         db: Database session
-        skip: Number of records to skip (offset)
+        stmt: WeatherRecord select with filters applied (but no ordering)
+        cursor: Cursor from the previous page, or None for the first page
         limit: Maximum number of records to return
 
     Returns:
-        Tuple of (records list, total count)
+        Tuple of (records list, cursor for the next page or None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor is not None:
+        created_at, record_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(models.WeatherRecord.created_at, models.WeatherRecord.id)
+            < tuple_(created_at, record_id)
+        )
+
+    stmt = stmt.order_by(
+        desc(models.WeatherRecord.created_at), desc(models.WeatherRecord.id)
+    ).limit(limit + 1)
+    records: list[models.WeatherRecord] = list(await db.scalars(stmt))
+    if len(records) <= limit:
+        return records, None
+
+    records.pop()
+    return records, encode_cursor(records[-1])
+
+
+async def count_weather_records(db: AsyncSession, location_name: str | None = None) -> int:
+    """
+    Count weather records, optionally filtered by partial location name.
+
+    Issues a bare SELECT count(*) without ordering or relation loading, so
+    Postgres can answer it from an index. The result is cached per filter for
+    up to _COUNT_TTL_SECONDS, in fixed time buckets, since an exact
+    count scans every matching row. Writes in this process drop the cache.
+
+    Args:
+        db: Database session
+        location_name: Partial location name to filter on, or None for all records
+
+    Returns:
+        Number of matching weather records (at most _COUNT_TTL_SECONDS stale)
     """
-    query = db.query(models.WeatherRecord).order_by(desc(models.WeatherRecord.created_at))
-    total: int = query.count()
-    records: list[models.WeatherRecord] = query.offset(skip).limit(limit).all()
-    return records, total
+    bucket = int(time.monotonic() // _COUNT_TTL_SECONDS)
+    cached = _count_cache.get(location_name)
+    if cached is not None and cached[0] == bucket:
+        return cached[1]
+
+    stmt = select(func.count()).select_from(models.WeatherRecord)
+    if location_name is not None:
+        stmt = stmt.join(models.Location).where(models.Location.name.ilike(f"%{location_name}%"))
+    total: int = await db.scalar(stmt)
+
+    if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.clear()
+    _count_cache[location_name] = (bucket, total)
+    return total
 
 
-def get_weather_by_location_exact(
-    db: Session, location_name: str, skip: int = 0, limit: int = 100
-) -> tuple[list[models.WeatherRecord], int]:
+async def get_weather_records(
+    db: AsyncSession, cursor: str | None = None, limit: int = 100
+) -> tuple[list[models.WeatherRecord], str | None]:
+    """
+    Get a page of weather records ordered by creation time (newest first).
+
+    Args:
+        db: Database session
+        cursor: Cursor from the previous page, or None for the first page
+        limit: Maximum number of records to return
+
+    Returns:
+        Tuple of (records list, cursor for the next page or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    stmt = select(models.WeatherRecord).options(*_WITH_RELATIONS)
+    return await _paginate(db, stmt, cursor, limit)
+
+
+async def get_weather_by_location_exact(
+    db: AsyncSession, location_name: str, cursor: str | None = None, limit: int = 100
+) -> tuple[list[models.WeatherRecord], str | None]:
     """
     Get weather records for a specific location by exact name match.
 
     Args:
         db: Database session
         location_name: Exact location name to search for
-        skip: Number of records to skip (offset)
+        cursor: Cursor from the previous page, or None for the first page
         limit: Maximum number of records to return
 
     Returns:
-        Tuple of (records list, total count)
+        Tuple of (records list, cursor for the next page or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
     """
-    query: Any = (
-        db.query(models.WeatherRecord)
+    stmt = (
+        select(models.WeatherRecord)
         .join(models.Location)
-        .filter(models.Location.name == location_name)
-        .order_by(desc(models.WeatherRecord.created_at))
+        .options(*_WITH_JOINED_LOCATION)
+        .where(models.Location.name == location_name)
     )
 
-    total: int = query.count()
-    records: list[models.WeatherRecord] = query.offset(skip).limit(limit).all()
-    return records, total
+    return await _paginate(db, stmt, cursor, limit)
 
 
-def get_weather_by_location(
-    db: Session, location_name: str, skip: int = 0, limit: int = 100
-) -> tuple[list[models.WeatherRecord], int]:
+async def get_weather_by_location(
+    db: AsyncSession, location_name: str, cursor: str | None = None, limit: int = 100
+) -> tuple[list[models.WeatherRecord], str | None]:
     """
     Get weather records for a location by partial name match (case-insensitive).
 
@@ -237,29 +435,53 @@ def get_weather_by_location(
     Args:
         db: Database session
         location_name: Partial location name to search for
-        skip: Number of records to skip (offset)
+        cursor: Cursor from the previous page, or None for the first page
         limit: Maximum number of records to return
 
     Returns:
-        Tuple of (records list, total count)
+        Tuple of (records list, cursor for the next page or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
     """
-    query: Any = (
-        db.query(models.WeatherRecord)
+    stmt = (
+        select(models.WeatherRecord)
         .join(models.Location)
-        .filter(models.Location.name.ilike(f"%{location_name}%"))
-        .order_by(desc(models.WeatherRecord.created_at))
+        .options(*_WITH_JOINED_LOCATION)
+        .where(models.Location.name.ilike(f"%{location_name}%"))
     )
 
-    total: int = query.count()
-    records: list[models.WeatherRecord] = query.offset(skip).limit(limit).all()
-    return records, total
+    return await _paginate(db, stmt, cursor, limit)
 
 
-def get_latest_weather_by_location(db: Session, location_name: str) -> models.WeatherRecord | None:
+def _invalidate_caches(location_names: Iterable[str]) -> None:
+    """
+    Drop cached counts and latest-record lookups that a write may have changed.
+
+    Every count can include the new records, so all of them go. Latest-record
+    keys are ILIKE search terms, so a key is stale whenever it is a substring
+    of a location that just received a record. Other API workers keep their
+    caches until the TTLs expire.
+
+    Args:
+        location_names: Names of locations that were written to
+    """
+    _count_cache.clear()
+    names = [name.lower() for name in location_names]
+    for key in [key for key in _latest_cache if any(key in name for name in names)]:
+        del _latest_cache[key]
+
+
+async def get_latest_weather_by_location(
+    db: AsyncSession, location_name: str
+) -> models.WeatherRecord | None:
     """
     Get the most recent weather record for a location.
 
-    Searches using partial name match (case-insensitive).
+    Searches using partial name match (case-insensitive). Results are cached
+    per lowercased search term for up to _LATEST_TTL_SECONDS, and dropped
+    early when a matching location receives a new record, so repeated polls
+    skip the database.
 
     Args:
         db: Database session
@@ -268,10 +490,23 @@ def get_latest_weather_by_location(db: Session, location_name: str) -> models.We
     Returns:
         Most recent WeatherRecord if found, None otherwise
     """
-    return (
-        db.query(models.WeatherRecord)
+    key = location_name.lower()
+    now = time.monotonic()
+    cached = _latest_cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    stmt = (
+        select(models.WeatherRecord)
         .join(models.Location)
-        .filter(models.Location.name.ilike(f"%{location_name}%"))
+        .options(*_WITH_JOINED_LOCATION)
+        .where(models.Location.name.ilike(f"%{location_name}%"))
         .order_by(desc(models.WeatherRecord.created_at))
-        .first()
+        .limit(1)
     )
+    record = (await db.scalars(stmt)).first()
+
+    if len(_latest_cache) >= _LATEST_CACHE_MAX_ENTRIES:
+        _latest_cache.clear()
+    _latest_cache[key] = (now + _LATEST_TTL_SECONDS, record)
+    return record
@@ -2,40 +2,44 @@
 
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 from .config import settings
 
-# Create database engine
-engine = create_engine(
-    settings.database_url,
+# Create async database engine (asyncpg), so queries don't block the event loop
+engine = create_async_engine(
+    settings.async_database_url,
     pool_pre_ping=True,  # Verify connections before using them
-    pool_size=5,
-    max_overflow=10,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_use_lifo=True,  # Reuse the most recent connection so idle ones can be recycled
 )
 
 # Create session factory
-SessionLocal: sessionmaker[Session] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects returned by an upsert's RETURNING are already current,
+# so serializing them after commit must not trigger a refresh SELECT
+SessionLocal: async_sessionmaker[AsyncSession] = async_sessionmaker(
+    bind=engine, autoflush=False, expire_on_commit=False
+)
 
 # Create base class for models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency to get database session.
 
-    Creates a new database session for each request and ensures it is
+    Creates a new async database session for each request and ensures it is
     properly closed afterward, even if an exception occurs.
 
     Yields:
-        SQLAlchemy database session
+        SQLAlchemy async database session
     """
-    db: Session = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,89 @@
+"""HTTP cache validators (ETag / Last-Modified) for read endpoints."""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from email.utils import format_datetime
+
+from fastapi import HTTPException, Request, Response
+
+from . import models
+
+
+def _weak_etag(parts: Iterable[object]) -> str:
+    """Hash the given values into a weak ETag."""
+    digest = hashlib.blake2b(repr(tuple(parts)).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _record_version(record: models.WeatherRecord) -> tuple[object, ...]:
+    """Values that change whenever the serialized record (with its relations) changes."""
+    return (
+        record.id,
+        record.updated_at,
+        record.location.updated_at,
+        record.condition.updated_at,
+    )
+
+
+def record_etag(record: models.WeatherRecord) -> str:
+    """
+    Build the ETag of a single weather record response.
+
+    Args:
+        record: Weather record with location and condition loaded
+
+    Returns:
+        Weak ETag derived from the record's id and update timestamps
+    """
+    return _weak_etag(_record_version(record))
+
+
+def page_etag(
+    records: Iterable[models.WeatherRecord], next_cursor: str | None, total: int | None
+) -> str:
+    """
+    Build the ETag of a paginated weather record list response.
+
+    Args:
+        records: Records on the page, with location and condition loaded
+        next_cursor: Cursor of the following page
+        total: Total match count included in the response, if any
+
+    Returns:
+        Weak ETag derived from the page contents
+    """
+    return _weak_etag((*map(_record_version, records), next_cursor, total))
+
+
+def check_etag(
+    request: Request, response: Response, etag: str, last_modified: datetime | None = None
+) -> None:
+    """
+    Attach cache validators to a response and short-circuit if the client copy is current.
+
+    Args:
+        request: Incoming request (read for If-None-Match)
+        response: Outgoing response the headers are set on
+        etag: ETag of the representation about to be returned
+        last_modified: Naive UTC modification time, sent as Last-Modified
+
+    Raises:
+        HTTPException: 304 Not Modified if If-None-Match matches the ETag
+    """
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(
+            last_modified.replace(tzinfo=UTC), usegmt=True
+        )
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return
+
+    # Weak comparison (RFC 9110 13.1.2): ignore the W/ prefix on either side
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates or etag.removeprefix("W/") in candidates:
+        raise HTTPException(status_code=304, headers=dict(response.headers))
@@ -0,0 +1,34 @@
+"""Loguru sink configuration for the API process."""
+
+import sys
+
+from loguru import logger
+
+# Plain format: stdout is collected by the container runtime, which does not render ANSI colors
+_LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+_configured = False
+
+
+def configure_logging(level: str = "INFO") -> None:
+    """
+    Route loguru output to stdout.
+
+    Only the first call installs the sink, so every entry point can call it safely.
+
+    Args:
+        level: Minimum level written to stdout
+    """
+    global _configured
+    if _configured:
+        return
+    logger.remove()
+    logger.add(sys.stdout, format=_LOG_FORMAT, level=level, colorize=False)
+    _configured = True
+
+
+def disable_logging() -> None:
+    """Remove every loguru sink and make later configure_logging() calls no-ops (for tests)."""
+    global _configured
+    logger.remove()
+    _configured = True
@@ -2,42 +2,76 @@
 
 from __future__ import annotations
 
-import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from loguru import logger
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import crud, schemas
+from .batching import WeatherRecordBatcher, get_batcher, is_record_error, write_weather_records
+from .config import settings
 from .database import get_db
+from .etags import check_etag, page_etag, record_etag
+from .logging_config import configure_logging
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Configure logging when the server starts rather than at import time"""
+    configure_logging()
+    yield
 
-# Configure loguru
-logger.remove()
-logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
-    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    level="INFO",
-)
 
 # Create FastAPI app
 app = FastAPI(
     title="Weather API",
     description="API for storing and retrieving weather data from the OpenWeather pipeline",
     version="0.1.0",
+    # orjson serializes floats and datetimes in C and emits bytes directly
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS
+# Credentials are only allowed for an explicit origin allowlist: with "*" the middleware
+# would echo any caller's origin back, which defeats the point of the allowlist
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials="*" not in settings.CORS_ORIGINS,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
+# Compress larger (list) responses; small bodies such as /health stay below minimum_size
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+def _page_response(response: Response, page: dict[str, Any]) -> Response:
+    """
+    Validate and serialize a WeatherRecordList page in one pydantic-core pass.
+
+    Returning a ready Response skips FastAPI's response_model round-trip
+    (validate, jsonable_encoder, then encode again) for up to 100 records.
+
+    Args:
+        response: Injected response carrying headers set by the handler (e.g. ETag)
+        page: WeatherRecordList fields, with ORM records under "records"
+
+    Returns:
+        JSON response with the serialized page
+    """
+    body = schemas.WeatherRecordList.model_validate(page, from_attributes=True).model_dump_json()
+    return Response(body, media_type="application/json", headers=dict(response.headers))
+
 
 @app.get("/health")
 async def health_check() -> dict[str, str]:
@@ -52,134 +86,226 @@ async def health_check() -> dict[str, str]:
 
 @app.post("/api/weather", response_model=schemas.WeatherRecordResponse, status_code=201)
 async def create_weather_record(
-    weather_data: dict[str, Any], db: Session = Depends(get_db)
+    weather_data: schemas.WeatherRecordCreate,
+    batcher: WeatherRecordBatcher = Depends(get_batcher),
 ) -> schemas.WeatherRecordResponse:
     """
     Create a new weather record.
 
     Accepts weather data from the consumer and stores it in the database.
-    Uses upsert pattern to prevent duplicate records.
+    The body is validated against WeatherRecordCreate, so malformed payloads
+    are rejected by FastAPI with a 422 before reaching the handler.
+    Uses upsert pattern to prevent duplicate records. Concurrent requests are
+    coalesced into batched writes by the WeatherRecordBatcher.
 
     Args:
         weather_data: Weather observation with location and current conditions
-        db: Database session
+        batcher: Shared weather record batcher
 
     Returns:
         Created or updated WeatherRecord
 
     Raises:
-        HTTPException: 400 if data is malformed, 500 for database errors
+        HTTPException: 422 if the database rejects the record (retrying cannot help),
+            500 for other database errors
     """
     try:
         logger.info("Received weather data")
-        logger.debug(f"Weather data: {weather_data}")
+        logger.opt(lazy=True).debug("Weather data: {}", lambda: weather_data)
 
-        record = crud.create_weather_record(db, weather_data)
-        logger.success(f"Weather record processed: ID={record.id}")
+        record = await batcher.submit(weather_data)
+        logger.success("Weather record processed: ID={}", record.id)
         return record
 
-    except KeyError as key_error:
-        logger.error(f"Missing required field in weather data: {key_error}")
-        raise HTTPException(status_code=400, detail=f"Missing required field: {str(key_error)}")
-    except ValueError as value_error:
-        logger.error(f"Invalid data format in weather record: {value_error}")
-        raise HTTPException(status_code=400, detail=f"Invalid data format: {str(value_error)}")
     except Exception as database_error:
-        logger.error(f"Database error creating weather record: {database_error}")
+        if is_record_error(database_error):
+            logger.error("Database rejected weather record: {}", database_error)
+            raise HTTPException(status_code=422, detail="Weather record rejected by the database")
+
+        logger.error("Database error creating weather record: {}", database_error)
         raise HTTPException(
             status_code=500, detail="Failed to create weather record. Please try again."
         )
 
 
+@app.post(
+    "/api/weather/bulk",
+    response_model=list[schemas.WeatherRecordResponse],
+    status_code=201,
+    responses={207: {"model": schemas.WeatherRecordBulkResult}},
+)
+async def create_weather_records_bulk(
+    weather_data: list[schemas.WeatherRecordCreate], db: AsyncSession = Depends(get_db)
+) -> list[schemas.WeatherRecordResponse] | Response:
+    """
+    Create or update many weather records in one request.
+
+    All records are upserted in a single transaction with multi-row
+    INSERT ... ON CONFLICT DO UPDATE statements, so request overhead and the
+    commit are paid once per batch instead of once per record. If the batch
+    fails, records are retried one by one so the good ones are still stored.
+
+    Args:
+        weather_data: Weather observations with location and current conditions
+        db: Database session
+
+    Returns:
+        Created or updated WeatherRecords, in the same order as the input (201).
+        If the database rejected some records, a 207 WeatherRecordBulkResult
+        with the stored records and the indexes of the rejected ones.
+
+    Raises:
+        HTTPException: 500 if a record failed for a reason other than its data
+            (e.g. the database is unreachable); retrying the batch is safe
+    """
+    logger.info("Received {} weather records", len(weather_data))
+
+    results = await write_weather_records(db, weather_data)
+    errors = [result for result in results if isinstance(result, Exception)]
+    if not errors:
+        logger.success("Weather records processed: {}", len(results))
+        return results
+
+    if not all(map(is_record_error, errors)):
+        logger.error("Database error creating weather records: {}", errors[0])
+        raise HTTPException(
+            status_code=500, detail="Failed to create weather records. Please try again."
+        )
+
+    failed = [index for index, result in enumerate(results) if isinstance(result, Exception)]
+    logger.error("Database rejected {} of {} weather records", len(failed), len(results))
+    records = [None if isinstance(result, Exception) else result for result in results]
+    body = schemas.WeatherRecordBulkResult.model_validate(
+        {"records": records, "failed": failed}, from_attributes=True
+    ).model_dump_json()
+    return Response(body, status_code=207, media_type="application/json")
+
+
 @app.get("/api/weather", response_model=schemas.WeatherRecordList)
 async def list_weather_records(
-    page: int = Query(1, ge=1, description="Page number (1-indexed)"),
-    page_size: int = Query(20, ge=1, le=100, description="Records per page (default 20)"),
-    db: Session = Depends(get_db),
-) -> schemas.WeatherRecordList:
+    request: Request,
+    response: Response,
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Records per page (default 20)"),
+    with_total: bool = Query(False, description="Include the total match count"),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
     """
-    List all weather records with pagination.
+    List all weather records with cursor pagination.
 
-    Returns weather records ordered by creation time (newest first).
+    Returns weather records ordered by creation time (newest first). Pass the
+    returned next_cursor back as `cursor` to fetch the following page.
+    Responses carry an ETag; a matching If-None-Match gets a bodiless 304.
 
     Args:
-        page: Page number (1-indexed)
-        page_size: Number of records per page (default 20, max 100)
+        request: Incoming request
+        response: Outgoing response (receives the ETag header)
+        cursor: Opaque cursor from the previous page (omit for the first page)
+        limit: Number of records per page (default 20, max 100)
+        with_total: Whether to include the (cached) total match count
         db: Database session
 
     Returns:
-        Paginated list of WeatherRecords with total count
+        Page of WeatherRecords with the cursor of the next page
+
+    Raises:
+        HTTPException: 304 if not modified, 400 if the cursor is malformed
     """
-    skip = (page - 1) * page_size
-    records, total = crud.get_weather_records(db, skip=skip, limit=page_size)
+    try:
+        records, next_cursor = await crud.get_weather_records(db, cursor=cursor, limit=limit)
+    except ValueError as cursor_error:
+        raise HTTPException(status_code=400, detail=str(cursor_error))
 
-    return {"total": total, "page": page, "page_size": page_size, "records": records}
+    total = await crud.count_weather_records(db) if with_total else None
+    check_etag(request, response, page_etag(records, next_cursor, total))
+    return _page_response(
+        response, {"records": records, "next_cursor": next_cursor, "total": total}
+    )
 
 
 @app.get("/api/weather/{record_id}", response_model=schemas.WeatherRecordResponse)
 async def get_weather_record(
-    record_id: int, db: Session = Depends(get_db)
+    record_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)
 ) -> schemas.WeatherRecordResponse:
     """
     Get a specific weather record by ID.
 
     Args:
         record_id: ID of the weather record
+        request: Incoming request
+        response: Outgoing response (receives ETag and Last-Modified headers)
         db: Database session
 
     Returns:
         WeatherRecord
 
     Raises:
-        HTTPException: 404 if record not found
+        HTTPException: 304 if not modified, 404 if record not found
     """
-    record = crud.get_weather_record(db, record_id)
+    record = await crud.get_weather_record(db, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Weather record not found")
+    check_etag(request, response, record_etag(record), record.updated_at)
     return record
 
 
 @app.get("/api/weather/location/{location_name}", response_model=schemas.WeatherRecordList)
 async def get_weather_by_location(
     location_name: str,
-    page: int = Query(1, ge=1, description="Page number (1-indexed)"),
-    page_size: int = Query(20, ge=1, le=100, description="Records per page (default 20)"),
-    db: Session = Depends(get_db),
-) -> schemas.WeatherRecordList:
+    request: Request,
+    response: Response,
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Records per page (default 20)"),
+    with_total: bool = Query(False, description="Include the total match count"),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
     """
     Get weather records for a location by partial name match (case-insensitive).
 
     Searches for locations whose name contains the search term.
     Results are ordered by creation time (newest first).
+    Responses carry an ETag; a matching If-None-Match gets a bodiless 304.
 
     Args:
         location_name: Partial location name to search for
-        page: Page number (1-indexed)
-        page_size: Number of records per page (default 20, max 100)
+        request: Incoming request
+        response: Outgoing response (receives the ETag header)
+        cursor: Opaque cursor from the previous page (omit for the first page)
+        limit: Number of records per page (default 20, max 100)
+        with_total: Whether to include the (cached) total match count
         db: Database session
 
     Returns:
-        Paginated list of WeatherRecords for the location
+        Page of WeatherRecords for the location with the cursor of the next page
 
     Raises:
-        HTTPException: 404 if no records found
+        HTTPException: 304 if not modified, 400 if the cursor is malformed,
+            404 if no records found
     """
-    skip = (page - 1) * page_size
-    records, total = crud.get_weather_by_location(db, location_name, skip=skip, limit=page_size)
+    try:
+        records, next_cursor = await crud.get_weather_by_location(
+            db, location_name, cursor=cursor, limit=limit
+        )
+    except ValueError as cursor_error:
+        raise HTTPException(status_code=400, detail=str(cursor_error))
 
     if not records:
         raise HTTPException(
             status_code=404, detail=f"No weather records found for location: {location_name}"
         )
 
-    return {"total": total, "page": page, "page_size": page_size, "records": records}
+    total = await crud.count_weather_records(db, location_name) if with_total else None
+    check_etag(request, response, page_etag(records, next_cursor, total))
+    return _page_response(
+        response, {"records": records, "next_cursor": next_cursor, "total": total}
+    )
 
 
 @app.get(
     "/api/weather/location/{location_name}/latest", response_model=schemas.WeatherRecordResponse
 )
 async def get_latest_weather(
-    location_name: str, db: Session = Depends(get_db)
+    location_name: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)
 ) -> schemas.WeatherRecordResponse:
     """
     Get the most recent weather record for a location.
@@ -189,25 +315,26 @@ async def get_latest_weather(
 
     Args:
         location_name: Partial location name to search for
+        request: Incoming request
+        response: Outgoing response (receives ETag and Last-Modified headers)
         db: Database session
 
     Returns:
         Most recent WeatherRecord for the location
 
     Raises:
-        HTTPException: 404 if no records found
+        HTTPException: 304 if not modified, 404 if no records found
     """
-    record = crud.get_latest_weather_by_location(db, location_name)
+    record = await crud.get_latest_weather_by_location(db, location_name)
     if not record:
         raise HTTPException(
             status_code=404, detail=f"No weather records found for location: {location_name}"
         )
+    check_etag(request, response, record_etag(record), record.updated_at)
     return record
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    from .config import settings
-
-    uvicorn.run("api_app.main:app", host=settings.API_HOST, port=settings.API_PORT, reload=True)
+    uvicorn.run("api_app.main:app", host=settings.API_HOST, port=settings.API_PORT)
@@ -31,8 +31,15 @@ class Location(Base):
 
     # Composite index for location lookups
     __table_args__ = (
-        Index("idx_location_coords", "lat", "lon"),
+        Index("idx_location_coords", "lat", "lon", unique=True),
         Index("idx_location_name_country", "name", "country"),
+        # Trigram index so ILIKE '%term%' searches avoid a sequential scan (needs pg_trgm)
+        Index(
+            "idx_location_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
     )
 
 
@@ -124,5 +131,8 @@ class WeatherRecord(Base):
     __table_args__ = (
         Index("idx_weather_location_created", "location_id", "created_at"),
         Index("idx_weather_last_updated", "last_updated_epoch"),
-        Index("idx_weather_upsert", "location_id", "condition_id", "localtime_epoch"),
+        Index("idx_weather_upsert", "location_id", "condition_id", "localtime_epoch", unique=True),
+        Index("idx_weather_localtime_epoch", "localtime_epoch"),
+        # Keyset pagination order: (created_at, id) DESC
+        Index("idx_weather_created_id", "created_at", "id"),
     )
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 
 
 # Location schemas
@@ -104,15 +104,21 @@ class CurrentWeatherBase(BaseModel):
     gti: float
 
 
+class CurrentWeatherInput(CurrentWeatherBase):
+    """Current weather input schema (includes the nested condition for API input)"""
+
+    condition: ConditionBase
+
+
 # Weather record request/response schemas
 class WeatherRecordCreate(BaseModel):
     """Schema for creating a weather record (matches API input)"""
 
     location: LocationInput
-    current: CurrentWeatherBase
-    condition: ConditionBase = Field(..., alias="current.condition")
+    current: CurrentWeatherInput
 
-    model_config = {"populate_by_name": True}
+    # Upstream payloads carry more fields than we store; drop them during validation
+    model_config = {"extra": "ignore"}
 
 
 class WeatherRecordResponse(BaseModel):
@@ -178,9 +184,21 @@ class WeatherRecordResponse(BaseModel):
 
 
 class WeatherRecordList(BaseModel):
-    """Schema for paginated weather records"""
+    """Schema for a cursor-paginated page of weather records"""
 
-    total: int
-    page: int
-    page_size: int
     records: list[WeatherRecordResponse]
+    next_cursor: str | None = None
+    """Cursor for the following page (None on the last page)"""
+
+    total: int | None = None
+    """Total matching records, only when requested with with_total (cached up to 30s)"""
+
+
+class WeatherRecordBulkResult(BaseModel):
+    """Schema for a bulk write in which the database rejected some of the records"""
+
+    records: list[WeatherRecordResponse | None]
+    """Stored record for each input position (None where the record was rejected)"""
+
+    failed: list[int]
+    """Indexes of the input records that were not stored"""
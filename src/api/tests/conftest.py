@@ -1,42 +1,149 @@
 """Pytest configuration and fixtures for E2E testing"""
 
+import hashlib
 import os
-from collections.abc import Generator
+import uuid
+from collections.abc import AsyncGenerator, Generator
 
+import httpx
+import pika
+import psycopg
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from pika.adapters.blocking_connection import BlockingChannel
+from psycopg import sql
+from sqlalchemy import URL, Engine, create_engine, make_url, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 from api_app.config import settings
 from api_app.database import Base
+from api_app.logging_config import disable_logging
 from api_app.main import app
 
 
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    """Run every async test on the session event loop shared with the session fixtures"""
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+
+# No log sink under pytest: nothing reads the output, so skip formatting it
+disable_logging()
+
+
+def _admin_connection() -> psycopg.Connection:
+    """Autocommit connection to the maintenance database, for CREATE/DROP DATABASE"""
+    return psycopg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        dbname="postgres",
+        autocommit=True,
+    )
+
+
+def _schema_fingerprint() -> str:
+    """Short hash of the DDL for the current models, so schema changes get a fresh template"""
+    dialect = postgresql.dialect()
+    ddl = [
+        str(CreateTable(table).compile(dialect=dialect)) for table in Base.metadata.sorted_tables
+    ]
+    ddl += [
+        str(CreateIndex(index).compile(dialect=dialect))
+        for table in Base.metadata.sorted_tables
+        for index in sorted(table.indexes, key=lambda index: index.name)
+    ]
+    return hashlib.blake2b("\n".join(ddl).encode(), digest_size=6).hexdigest()
+
+
+def _database_url(name: str) -> URL:
+    """Connection URL of another database on the configured server"""
+    return make_url(settings.database_url).set(database=name)
+
+
+@pytest.fixture(scope="session")
+def template_database() -> str:
+    """Ensure a template database holding the current schema exists and return its name"""
+    name = f"weather_template_{_schema_fingerprint()}"
+
+    with _admin_connection() as admin:
+        row = admin.execute(
+            "SELECT datistemplate FROM pg_database WHERE datname = %s", (name,)
+        ).fetchone()
+        if row is not None and row[0]:
+            return name
+        # A database that never got flagged as template is left over from a failed build
+        admin.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+        admin.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+
+    engine = create_engine(_database_url(name), poolclass=NullPool)
+    with engine.begin() as conn:
+        # Trigram indexes need pg_trgm, which migrations normally install
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        Base.metadata.create_all(bind=conn)
+    engine.dispose()
+
+    with _admin_connection() as admin:
+        admin.execute(sql.SQL("ALTER DATABASE {} IS_TEMPLATE true").format(sql.Identifier(name)))
+
+    return name
+
+
 @pytest.fixture(scope="session")
-def test_db_engine():
-    """Create a test database engine"""
-    # Use the same database but we'll use transactions for isolation
+def test_db_engine(template_database: str) -> Generator[Engine, None, None]:
+    """Create a throwaway test database cloned from the schema template"""
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    with _admin_connection() as admin:
+        # File-level copy of the template instead of replaying the DDL
+        admin.execute(
+            sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                sql.Identifier(name), sql.Identifier(template_database)
+            )
+        )
+
     engine = create_engine(
-        settings.database_url,
+        _database_url(name),
         pool_pre_ping=True,
         pool_size=5,
         max_overflow=10,
     )
 
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-
     yield engine
 
-    # Drop all tables after tests complete
-    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    with _admin_connection() as admin:
+        admin.execute(
+            sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(name))
+        )
+
+
+@pytest.fixture(scope="session")
+def test_async_engine(test_db_engine: Engine) -> AsyncEngine:
+    """Create an async test engine for the API under test"""
+    # Pooled connections stay on the session test client's event loop (see app_client)
+    return create_async_engine(test_db_engine.url.set(drivername="postgresql+asyncpg"))
+
+
+@pytest.fixture(scope="session")
+def pipeline_db_engine() -> Generator[Engine, None, None]:
+    """Engine on the database the running pipeline writes to (schema managed by Alembic)"""
+    engine = create_engine(settings.database_url, pool_pre_ping=True)
+    yield engine
+    engine.dispose()
 
 
 @pytest.fixture
-def test_db_session(test_db_engine) -> Generator[Session, None, None]:
+def test_db_session(pipeline_db_engine: Engine) -> Generator[Session, None, None]:
     """Create a new database session for each test with transaction rollback"""
-    connection = test_db_engine.connect()
+    connection = pipeline_db_engine.connect()
 
     # Start a nested transaction
     transaction = connection.begin()
@@ -53,25 +160,85 @@ def test_db_session(test_db_engine) -> Generator[Session, None, None]:
     connection.close()
 
 
-@pytest.fixture
-def test_client(test_db_session: Session) -> TestClient:
-    """Create a FastAPI test client with test database session"""
+@pytest.fixture(scope="session")
+def app_client(test_async_engine: AsyncEngine) -> Generator[TestClient, None, None]:
+    """Start the app once per session; its portal event loop owns the async engine's pool"""
+    with TestClient(app) as client:
+        yield client
+        # asyncpg connections must be closed on the loop that opened them
+        client.portal.call(test_async_engine.dispose)
 
-    def override_get_db() -> Generator[Session, None, None]:
-        yield test_db_session
 
+@pytest.fixture
+def test_client(
+    app_client: TestClient, test_async_engine: AsyncEngine
+) -> Generator[TestClient, None, None]:
+    """FastAPI test client whose async test session is rolled back after the test"""
+    from api_app import crud
+    from api_app.batching import WeatherRecordBatcher, get_batcher
     from api_app.database import get_db
 
+    # Cached counts and latest records of earlier (rolled back) tests must not leak in
+    crud._count_cache.clear()
+    crud._latest_cache.clear()
+
+    # The async connection must be opened on the client's event loop (its portal)
+    async def begin() -> tuple:
+        connection = await test_async_engine.connect()
+        transaction = await connection.begin()
+        # Session commits and rollbacks only release or roll back savepoints, so a
+        # failed write in the middle of a test keeps the records written before it
+        session = AsyncSession(
+            bind=connection,
+            autoflush=False,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        return connection, transaction, session
+
+    connection, transaction, session = app_client.portal.call(begin)
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    # Route batched writes through the test session so they are rolled back too
+    app.dependency_overrides[get_batcher] = lambda: WeatherRecordBatcher(lambda: session)
 
-    client = TestClient(app)
-    yield client
+    yield app_client
 
     # Clean up dependency overrides
     app.dependency_overrides.clear()
 
+    # Rollback the transaction (cleanup test data)
+    async def rollback() -> None:
+        await session.close()
+        await transaction.rollback()
+        await connection.close()
+
+    app_client.portal.call(rollback)
 
-@pytest.fixture
+
+@pytest_asyncio.fixture(scope="session")
+async def http_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Shared HTTP client so service probes reuse keep-alive connections"""
+    async with httpx.AsyncClient(
+        timeout=5, limits=httpx.Limits(max_keepalive_connections=20)
+    ) as client:
+        yield client
+
+
+@pytest_asyncio.fixture
+async def weather_listener() -> AsyncGenerator[psycopg.AsyncConnection, None]:
+    """Connection LISTENing for the weather_inserted trigger on the pipeline database"""
+    async with await psycopg.AsyncConnection.connect(
+        settings.database_url, autocommit=True
+    ) as connection:
+        await connection.execute("LISTEN weather_inserted")
+        yield connection
+
+
+@pytest.fixture(scope="session")
 def rabbitmq_config():
     """RabbitMQ connection configuration"""
     return {
@@ -81,7 +248,30 @@ def rabbitmq_config():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def rabbit_channel(rabbitmq_config: dict) -> Generator[BlockingChannel, None, None]:
+    """Long-lived RabbitMQ channel for publishing test messages"""
+    connection = pika.BlockingConnection(
+        pika.ConnectionParameters(
+            rabbitmq_config["host"],
+            rabbitmq_config["port"],
+            # A blocking connection only services heartbeats inside pika calls,
+            # and this one sits idle while tests poll the database
+            heartbeat=0,
+            connection_attempts=3,
+        )
+    )
+    channel = connection.channel()
+    # Declared once per session, with the same (non-durable) properties the
+    # producer and consumer use, so the declare never conflicts
+    channel.queue_declare(queue=rabbitmq_config["queue_name"])
+
+    yield channel
+
+    connection.close()
+
+
+@pytest.fixture(scope="session")
 def postgres_config():
     """PostgreSQL connection configuration"""
     return {
@@ -93,13 +283,13 @@ def postgres_config():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def api_url():
     """API base URL for E2E tests"""
     return os.getenv("API_URL", "http://localhost:8000")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def metabase_url():
     """Metabase URL for health checks"""
     return os.getenv("METABASE_URL", "http://localhost:3000")
@@ -0,0 +1,173 @@
+"""In-process tests for the weather API endpoints"""
+
+from api_app import crud
+from tests.test_e2e_pipeline import get_test_weather_message
+
+
+def make_weather_message(localtime_epoch: int) -> dict:
+    """Test weather message observed at the given epoch"""
+    message = get_test_weather_message()
+    message["location"]["localtime_epoch"] = localtime_epoch
+    return message
+
+
+def make_rejected_message(localtime_epoch: int) -> dict:
+    """Test weather message that passes validation but that the database refuses"""
+    message = make_weather_message(localtime_epoch)
+    # weather_records.wind_dir is VARCHAR(10)
+    message["current"]["wind_dir"] = "S" * 20
+    return message
+
+
+def test_bulk_reports_rejected_records_and_stores_the_rest(test_client):
+    """The database refusing some records yields a 207 naming them; the others are stored"""
+    messages = [
+        make_weather_message(1700000000),
+        make_rejected_message(1700003600),
+        make_weather_message(1700007200),
+        make_rejected_message(1700010800),
+    ]
+
+    response = test_client.post("/api/weather/bulk", json=messages)
+
+    assert response.status_code == 207
+    result = response.json()
+    assert result["failed"] == [1, 3]
+    assert [record and record["localtime_epoch"] for record in result["records"]] == [
+        1700000000,
+        None,
+        1700007200,
+        None,
+    ]
+    stored = test_client.get("/api/weather").json()["records"]
+    assert sorted(record["localtime_epoch"] for record in stored) == [1700000000, 1700007200]
+
+
+def test_bulk_fails_whole_batch_on_transient_errors(test_client, monkeypatch):
+    """Errors unrelated to the records themselves are a 500, so the batch can be retried"""
+
+    async def database_unavailable(db, weather_data_list):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(crud, "create_weather_records", database_unavailable)
+
+    response = test_client.post("/api/weather/bulk", json=[make_weather_message(1700000000)])
+
+    assert response.status_code == 500
+
+
+def test_single_record_rejected_by_database_is_422(test_client):
+    """A record the database refuses is a client error, not a retryable 500"""
+    response = test_client.post("/api/weather", json=make_rejected_message(1700000000))
+
+    assert response.status_code == 422
+
+
+def test_list_pages_through_records_with_cursor(test_client):
+    """Following next_cursor walks every record once, newest first, and ends with None"""
+    messages = [make_weather_message(1700000000 + hour * 3600) for hour in range(3)]
+    created = test_client.post("/api/weather/bulk", json=messages)
+    assert created.status_code == 201
+    created_ids = {record["id"] for record in created.json()}
+
+    first_page = test_client.get("/api/weather", params={"limit": 2})
+    assert first_page.status_code == 200
+    first = first_page.json()
+    assert len(first["records"]) == 2
+    assert first["next_cursor"] is not None
+
+    second_page = test_client.get(
+        "/api/weather", params={"limit": 2, "cursor": first["next_cursor"]}
+    )
+    assert second_page.status_code == 200
+    second = second_page.json()
+    assert len(second["records"]) == 1
+    assert second["next_cursor"] is None
+
+    records = first["records"] + second["records"]
+    assert {record["id"] for record in records} == created_ids
+    sort_keys = [(record["created_at"], record["id"]) for record in records]
+    assert sort_keys == sorted(sort_keys, reverse=True)
+
+
+def test_list_rejects_malformed_cursor(test_client):
+    """A cursor that was not produced by the API is a 400, not a 500"""
+    response = test_client.get("/api/weather", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+def test_list_etag_revalidation(test_client):
+    """Replaying the ETag gets a bodiless 304 until a new record changes the page"""
+    test_client.post("/api/weather", json=make_weather_message(1700000000))
+
+    page = test_client.get("/api/weather")
+    assert page.status_code == 200
+    etag = page.headers["ETag"]
+
+    not_modified = test_client.get("/api/weather", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    test_client.post("/api/weather", json=make_weather_message(1700003600))
+
+    changed = test_client.get("/api/weather", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()["records"]) == 2
+
+
+class FakeClock:
+    """Replacement for crud's time module whose monotonic clock only moves when told to"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def get_total(test_client) -> int:
+    """Total record count reported by the list endpoint"""
+    return test_client.get("/api/weather", params={"with_total": True}).json()["total"]
+
+
+def get_latest_id(test_client) -> int | None:
+    """ID of the latest record for the test location, or None if it has none"""
+    response = test_client.get("/api/weather/location/Test City/latest")
+    return response.json()["id"] if response.status_code == 200 else None
+
+
+def test_write_refreshes_count_and_latest(test_client):
+    """A record written through the API shows up in the cached count and latest lookups"""
+    total = get_total(test_client)
+    assert get_latest_id(test_client) is None
+
+    first = test_client.post("/api/weather", json=make_weather_message(1700000000)).json()
+    assert get_total(test_client) == total + 1
+    assert get_latest_id(test_client) == first["id"]
+
+    second = test_client.post("/api/weather", json=make_weather_message(1700003600)).json()
+    assert get_total(test_client) == total + 2
+    assert get_latest_id(test_client) == second["id"]
+
+
+def test_unseen_write_is_served_stale_only_within_ttl(test_client, monkeypatch):
+    """Writes by another worker (no local invalidation) appear once the cache TTL runs out"""
+    clock = FakeClock()
+    monkeypatch.setattr(crud, "time", clock)
+    monkeypatch.setattr(crud, "_invalidate_caches", lambda location_names: None)
+
+    total = get_total(test_client)
+    assert get_latest_id(test_client) is None
+    record = test_client.post("/api/weather", json=make_weather_message(1700000000)).json()
+
+    clock.now = min(crud._COUNT_TTL_SECONDS, crud._LATEST_TTL_SECONDS) - 1
+    assert get_total(test_client) == total
+    assert get_latest_id(test_client) is None
+
+    clock.now = max(crud._COUNT_TTL_SECONDS, crud._LATEST_TTL_SECONDS)
+    assert get_total(test_client) == total + 1
+    assert get_latest_id(test_client) == record["id"]
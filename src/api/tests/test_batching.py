@@ -0,0 +1,130 @@
+"""Unit tests for WeatherRecordBatcher with the crud layer stubbed out"""
+
+import asyncio
+
+import pytest
+
+from api_app import crud
+from api_app.batching import WeatherRecordBatcher
+
+
+class FakeSession:
+    """Stand-in for an AsyncSession that only tracks being closed"""
+
+    def __init__(self) -> None:
+        self.closed = False
+
+    def expunge_all(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeCrud:
+    """Records every batch written; payloads named "bad" fail like a rejected row"""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def create_weather_records(self, db, payloads: list[str]) -> list[str]:
+        self.batches.append(list(payloads))
+        await self.release.wait()
+        if "bad" in payloads:
+            raise RuntimeError("row rejected by the database")
+        return [f"record-{payload}" for payload in payloads]
+
+    async def create_weather_record(self, db, payload: str) -> str:
+        return (await self.create_weather_records(db, [payload]))[0]
+
+
+async def run_ready_tasks() -> None:
+    """Yield to the event loop a few times so freshly created tasks reach their first await"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def fake_crud(monkeypatch: pytest.MonkeyPatch) -> FakeCrud:
+    """Route the batcher's crud calls to a FakeCrud"""
+    fake = FakeCrud()
+    monkeypatch.setattr(crud, "create_weather_records", fake.create_weather_records)
+    monkeypatch.setattr(crud, "create_weather_record", fake.create_weather_record)
+    return fake
+
+
+@pytest.fixture
+def sessions() -> list[FakeSession]:
+    """Sessions handed out by the batcher's session factory, in order"""
+    return []
+
+
+@pytest.fixture
+def batcher(sessions: list[FakeSession]) -> WeatherRecordBatcher:
+    """Batcher whose session factory hands out FakeSessions"""
+
+    def session_factory() -> FakeSession:
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    return WeatherRecordBatcher(session_factory, max_batch_size=3)
+
+
+@pytest.mark.asyncio
+async def test_submissions_during_a_write_coalesce_into_the_next_batch(
+    batcher: WeatherRecordBatcher, fake_crud: FakeCrud
+):
+    """A lone request is written on its own; requests arriving meanwhile share a batch"""
+    fake_crud.release.clear()
+    first = asyncio.create_task(batcher.submit("a"))
+    await run_ready_tasks()
+    assert fake_crud.batches == [["a"]]
+
+    later = [asyncio.create_task(batcher.submit(payload)) for payload in "bcde"]
+    await run_ready_tasks()
+    fake_crud.release.set()
+
+    assert await first == "record-a"
+    assert await asyncio.gather(*later) == ["record-b", "record-c", "record-d", "record-e"]
+    # Capped at max_batch_size: the fourth waiting payload goes out in a batch of its own
+    assert fake_crud.batches == [["a"], ["b", "c", "d"], ["e"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_retries_records_individually(
+    batcher: WeatherRecordBatcher, fake_crud: FakeCrud
+):
+    """Only the request with the bad payload fails; the rest of its batch is stored"""
+    results = await asyncio.gather(
+        *(batcher.submit(payload) for payload in ("a", "bad", "c")), return_exceptions=True
+    )
+
+    assert results[0] == "record-a"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "record-c"
+    assert fake_crud.batches == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_drain_writes_everything_pending(
+    batcher: WeatherRecordBatcher, fake_crud: FakeCrud, sessions: list[FakeSession]
+):
+    """Queued payloads are all written, each batch's session closed, even if a waiter is gone"""
+    fake_crud.release.clear()
+    waiters = [asyncio.create_task(batcher.submit(payload)) for payload in "abcdefg"]
+    await run_ready_tasks()
+    # A request that goes away (e.g. its client disconnects) must not stop the drain
+    waiters[4].cancel()
+    fake_crud.release.set()
+
+    await batcher._drain_task
+
+    assert fake_crud.batches == [["a", "b", "c"], ["d", "e", "f"], ["g"]]
+    assert len(sessions) == 3
+    assert all(session.closed for session in sessions)
+    assert waiters[4].cancelled()
+    assert [await waiters[index] for index in (0, 1, 2, 3, 5, 6)] == [
+        f"record-{payload}" for payload in "abcdfg"
+    ]
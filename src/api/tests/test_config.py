@@ -0,0 +1,22 @@
+"""Tests for locating the .env file from each service's config module"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+_SRC_DIR = Path(__file__).resolve().parents[2]
+
+
+@pytest.mark.parametrize("service", ["api", "consumer", "producer"])
+def test_config_imports_from_shallow_path(service: str, monkeypatch: pytest.MonkeyPatch):
+    """Config must import when installed right below / (e.g. /app/api_app in the image)"""
+    source = (_SRC_DIR / service / f"{service}_app" / "config.py").read_text()
+    module = types.ModuleType(f"shallow_{service}_config")
+    module.__file__ = f"/app/{service}_app/config.py"
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+
+    assert module._ENV_PATH == Path("/.env")
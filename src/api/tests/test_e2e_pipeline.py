@@ -1,16 +1,30 @@
 """End-to-End tests for the weather data pipeline"""
 
 import asyncio
-import json
+import time
+from collections.abc import Callable
+from typing import TypeVar
 
 import httpx
+import orjson
 import pika
+import psycopg
 import pytest
-from sqlalchemy import create_engine, text
+from pika.adapters.blocking_connection import BlockingChannel
+from sqlalchemy import bindparam, create_engine, select, text
 from sqlalchemy.orm import Session
 
 from api_app.models import WeatherRecord
 
+T = TypeVar("T")
+
+# Built once and reused by every lookup; SQLAlchemy caches its compiled SQL
+_RECORD_BY_EPOCH = (
+    select(WeatherRecord)
+    .where(WeatherRecord.localtime_epoch == bindparam("localtime_epoch"))
+    .limit(1)
+)
+
 # ========================
 # Health Check Functions
 # ========================
@@ -45,23 +59,21 @@ def check_postgres_health(host: str, port: int, user: str, password: str, db: st
         raise ConnectionError(f"PostgreSQL unreachable at {host}:{port}: {e}")
 
 
-async def check_metabase_health(url: str) -> bool:
+async def check_metabase_health(client: httpx.AsyncClient, url: str) -> bool:
     """Check if Metabase is healthy and reachable"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=5)
-            # 200 is running, 302 is redirect to setup, 404 might be ok depending on state
-            return response.status_code in [200, 302, 404]
+        response = await client.get(url, timeout=5)
+        # 200 is running, 302 is redirect to setup, 404 might be ok depending on state
+        return response.status_code in [200, 302, 404]
     except Exception as e:
         raise ConnectionError(f"Metabase unreachable at {url}: {e}")
 
 
-async def check_api_health(api_url: str) -> bool:
+async def check_api_health(client: httpx.AsyncClient, api_url: str) -> bool:
     """Check if API is healthy"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{api_url}/health", timeout=5)
-            return response.status_code == 200
+        response = await client.get(f"{api_url}/health", timeout=5)
+        return response.status_code == 200
     except Exception as e:
         raise ConnectionError(f"API unreachable at {api_url}: {e}")
 
@@ -126,6 +138,45 @@ def get_test_weather_message() -> dict:
     }
 
 
+async def poll_until(check: Callable[[], T | None], timeout: float = 60.0) -> T | None:
+    """Call check with exponential backoff (25 ms to 1 s) until it returns a value or times out"""
+    deadline = time.monotonic() + timeout
+    delay = 0.025
+    while (result := check()) is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 1.6, 1.0)
+    return result
+
+
+def find_weather_record(session: Session, localtime_epoch: int) -> WeatherRecord | None:
+    """Look up the weather record with the given localtime_epoch"""
+    return session.scalars(_RECORD_BY_EPOCH, {"localtime_epoch": localtime_epoch}).first()
+
+
+async def wait_for_record(
+    session: Session,
+    listener: psycopg.AsyncConnection,
+    localtime_epoch: int,
+    timeout: float = 60.0,
+) -> WeatherRecord | None:
+    """Return the record, waiting for the weather_inserted NOTIFY if it is not there yet"""
+    record = find_weather_record(session, localtime_epoch)
+    if record is None:
+        # The insert trigger publishes each new row's localtime_epoch
+        async for notify in listener.notifies(timeout=timeout):
+            if notify.payload == str(localtime_epoch):
+                return find_weather_record(session, localtime_epoch)
+    return record
+
+
+def publish_message(channel: BlockingChannel, queue_name: str, message: dict) -> None:
+    """Publish a test message on the shared RabbitMQ channel"""
+    channel.basic_publish(exchange="", routing_key=queue_name, body=orjson.dumps(message))
+
+
 # ========================
 # E2E Pipeline Tests
 # ========================
@@ -133,7 +184,11 @@ def get_test_weather_message() -> dict:
 
 @pytest.mark.asyncio
 async def test_service_health_checks(
-    api_url: str, rabbitmq_config: dict, postgres_config: dict, metabase_url: str
+    http_client: httpx.AsyncClient,
+    api_url: str,
+    rabbitmq_config: dict,
+    postgres_config: dict,
+    metabase_url: str,
 ):
     """Test that all services are healthy and reachable"""
     # Check RabbitMQ
@@ -149,18 +204,22 @@ async def test_service_health_checks(
     )
 
     # Check API
-    assert await check_api_health(api_url)
+    assert await check_api_health(http_client, api_url)
 
     # Check Metabase (optional - may not be running)
     try:
-        assert await check_metabase_health(metabase_url)
+        assert await check_metabase_health(http_client, metabase_url)
     except ConnectionError:
         pytest.skip("Metabase not running (optional service)")
 
 
 @pytest.mark.asyncio
 async def test_full_pipeline(
-    test_client, test_db_session: Session, rabbitmq_config: dict, postgres_config: dict
+    test_client,
+    test_db_session: Session,
+    weather_listener: psycopg.AsyncConnection,
+    rabbit_channel: BlockingChannel,
+    rabbitmq_config: dict,
 ):
     """Test the complete pipeline: RabbitMQ -> Consumer -> API -> Database"""
 
@@ -168,50 +227,12 @@ async def test_full_pipeline(
     test_message = get_test_weather_message()
 
     # Publish message to RabbitMQ
-    try:
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(
-                rabbitmq_config["host"],
-                rabbitmq_config["port"],
-                heartbeat=5,
-                connection_attempts=3,
-            )
-        )
-        channel = connection.channel()
-        # Declare queue passively (don't modify existing queue properties)
-        try:
-            channel.queue_declare(queue=rabbitmq_config["queue_name"], passive=True)
-        except pika.exceptions.ChannelClosedByBroker:
-            # Queue doesn't exist, create it
-            channel = connection.channel()
-            channel.queue_declare(queue=rabbitmq_config["queue_name"])
-
-        channel.basic_publish(
-            exchange="",
-            routing_key=rabbitmq_config["queue_name"],
-            body=json.dumps(test_message),
-        )
-        connection.close()
-    except Exception as e:
-        pytest.fail(f"Failed to publish message to RabbitMQ: {e}")
-
-    # Poll the database for the record to appear (allow consumer time to process)
-    max_attempts = 60  # 60 seconds total
-    poll_interval = 1  # 1 second between polls
-    record = None
-
-    for attempt in range(max_attempts):
-        # Query the database for a record matching our test data
-        record = (
-            test_db_session.query(WeatherRecord)
-            .filter(WeatherRecord.localtime_epoch == test_message["location"]["localtime_epoch"])
-            .first()
-        )
+    publish_message(rabbit_channel, rabbitmq_config["queue_name"], test_message)
 
-        if record:
-            break
-
-        await asyncio.sleep(poll_interval)
+    # Wait for the record to appear (allow consumer time to process)
+    record = await wait_for_record(
+        test_db_session, weather_listener, test_message["location"]["localtime_epoch"]
+    )
 
     # Verify record was created
     assert record is not None, "Consumer did not process message in time (30+ seconds)"
@@ -237,78 +258,44 @@ async def test_full_pipeline(
 
 
 @pytest.mark.asyncio
-async def test_upsert_idempotency(test_client, test_db_session: Session, rabbitmq_config: dict):
+async def test_upsert_idempotency(
+    test_client,
+    test_db_session: Session,
+    weather_listener: psycopg.AsyncConnection,
+    rabbit_channel: BlockingChannel,
+    rabbitmq_config: dict,
+):
     """Test that duplicate messages don't create duplicate records (upsert pattern)"""
 
     test_message = get_test_weather_message()
 
-    # Function to publish message
-    def publish_message():
-        try:
-            connection = pika.BlockingConnection(
-                pika.ConnectionParameters(
-                    rabbitmq_config["host"],
-                    rabbitmq_config["port"],
-                    heartbeat=5,
-                    connection_attempts=3,
-                )
-            )
-            channel = connection.channel()
-            # Declare queue passively (don't modify existing queue properties)
-            try:
-                channel.queue_declare(queue=rabbitmq_config["queue_name"], passive=True)
-            except pika.exceptions.ChannelClosedByBroker:
-                # Queue doesn't exist, create it
-                channel = connection.channel()
-                channel.queue_declare(queue=rabbitmq_config["queue_name"])
-
-            channel.basic_publish(
-                exchange="",
-                routing_key=rabbitmq_config["queue_name"],
-                body=json.dumps(test_message),
-            )
-            connection.close()
-        except Exception as e:
-            pytest.fail(f"Failed to publish message: {e}")
-
     # Publish message first time
-    publish_message()
+    publish_message(rabbit_channel, rabbitmq_config["queue_name"], test_message)
+
+    localtime_epoch = test_message["location"]["localtime_epoch"]
 
     # Wait for message to be processed
-    record_1_id = None
-    for attempt in range(60):
-        record = (
-            test_db_session.query(WeatherRecord)
-            .filter(WeatherRecord.localtime_epoch == test_message["location"]["localtime_epoch"])
-            .first()
-        )
-        if record:
-            record_1_id = record.id
-            created_at_1 = record.created_at
-            updated_at_1 = record.updated_at
-            break
-        await asyncio.sleep(1)
+    record = await wait_for_record(test_db_session, weather_listener, localtime_epoch)
 
-    assert record_1_id is not None, "First message not processed"
+    assert record is not None, "First message not processed"
+    record_1_id = record.id
+    created_at_1 = record.created_at
+    updated_at_1 = record.updated_at
 
     # Wait a bit before publishing duplicate
     await asyncio.sleep(2)
 
     # Publish same message again
-    publish_message()
+    publish_message(rabbit_channel, rabbitmq_config["queue_name"], test_message)
 
-    # Wait for second message to be processed
-    for attempt in range(60):
+    def find_updated_record() -> WeatherRecord | None:
         test_db_session.expire_all()  # Refresh from DB
-        record = (
-            test_db_session.query(WeatherRecord)
-            .filter(WeatherRecord.localtime_epoch == test_message["location"]["localtime_epoch"])
-            .first()
-        )
-        if record and record.updated_at > updated_at_1:
-            # Record was updated
-            break
-        await asyncio.sleep(1)
+        record = find_weather_record(test_db_session, localtime_epoch)
+        return record if record and record.updated_at > updated_at_1 else None
+
+    # Wait for second message to be processed (record updated).
+    # The upsert updates the row, which the insert trigger does not report, so poll.
+    await poll_until(find_updated_record, timeout=60)
 
     # Verify only one record exists (not two)
     count = (
@@ -1,17 +1,17 @@
 """Configuration for the weather data consumer service."""
 
+from functools import lru_cache
 from pathlib import Path
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-
-def _get_project_root() -> Path:
-    """
-    Returns the root of the project
-    """
-    current_file_dir: Path = Path(__file__).parent.resolve()
-    # consumer_app -> consumer -> src -> root
-    return current_file_dir.parent.parent.parent
+# .env at the project root, computed once at import
+# config.py -> consumer_app -> consumer -> src -> root; images install the package
+# closer to / (e.g. /app/consumer_app), so stop at the filesystem root instead
+_PARENTS = Path(__file__).parents
+_ENV_PATH: Path = _PARENTS[min(3, len(_PARENTS) - 1)] / ".env"
+# Without a .env (e.g. containers configured purely via env vars) skip dotenv parsing
+_ENV_FILE: Path | None = _ENV_PATH if _ENV_PATH.is_file() else None
 
 
 class Settings(BaseSettings):
@@ -30,10 +30,46 @@ class Settings(BaseSettings):
     # Internal API Configuration
     API_URL: str = "http://localhost:8000/api/weather"
 
-    class Config:
-        env_file: str = str(_get_project_root() / ".env")
-        env_file_encoding: str = "utf-8"
-        extra: str = "ignore"
+    # Batching: forward up to BATCH_MAX_SIZE messages per bulk request, flushing
+    # a partial batch once its oldest message has waited BATCH_MAX_WAIT_MS
+    BATCH_MAX_SIZE: int = 64
+    BATCH_MAX_WAIT_MS: int = 200
+
+    # Batches posted concurrently; prefetch is BATCH_MAX_SIZE * MAX_IN_FLIGHT_BATCHES
+    MAX_IN_FLIGHT_BATCHES: int = 4
+
+    @property
+    def bulk_api_url(self) -> str:
+        """Bulk insert endpoint next to API_URL."""
+        return f"{self.API_URL.rstrip('/')}/bulk"
+
+    model_config = SettingsConfigDict(
+        env_file=_ENV_FILE,
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the process-wide settings instance.
+
+    Constructed on first call and cached afterwards, so the .env file is
+    parsed once. Tests that change the environment can call
+    ``get_settings.cache_clear()`` to force a reload.
+
+    Returns:
+        Cached Settings instance
+    """
+    return Settings()
+
+
+settings: Settings
 
 
-settings: Settings = Settings()
+def __getattr__(name: str) -> Settings:
+    """Build ``settings`` on first access (PEP 562) rather than at import."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,11 @@
 """Message consumer for weather data."""
 
-import json
+import asyncio
 
-import pika
-from pika.adapters.blocking_connection import BlockingChannel
-import requests
+import aio_pika
+import httpx
+import orjson
+from aio_pika.abc import AbstractIncomingMessage
 from loguru import logger
 
 from .config import settings
@@ -15,115 +16,234 @@ class MessageConsumer:
     RabbitMQ message consumer that processes weather data.
 
     Receives messages from a RabbitMQ queue, parses JSON weather data,
-    and forwards it to the internal weather API. Uses manual acknowledgment
-    for reliability with retry logic for transient failures.
+    and forwards it to the internal weather API in batches. Several batches
+    can be in flight at once while the next messages are received. Uses
+    manual acknowledgment for reliability with retry logic for transient failures.
     """
 
     def __init__(self) -> None:
-        """Initialize RabbitMQ connection and channel."""
-        logger.info("Connecting to RabbitMQ")
-        self.connection: pika.BlockingConnection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=settings.RABBIT_HOST)
+        """Initialize batching state; connections are opened by start_consuming."""
+        self.http: httpx.AsyncClient | None = None
+
+        # Parsed messages waiting to be forwarded, with their AMQP message to settle
+        self._batch: list[tuple[AbstractIncomingMessage, dict]] = []
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._in_flight: asyncio.Semaphore = asyncio.Semaphore(
+            settings.MAX_IN_FLIGHT_BATCHES
         )
-        self.channel: BlockingChannel = self.connection.channel()
-        self.channel.queue_declare(queue=settings.QUEUE_NAME)
-        logger.success("Connected to RabbitMQ")
+        self._send_tasks: set[asyncio.Task] = set()
 
-    def callback(
-        self,
-        channel: BlockingChannel,
-        method,
-        properties,
-        body: bytes,
-    ) -> None:
+    async def callback(self, message: AbstractIncomingMessage) -> None:
         """
         Process a message from the RabbitMQ queue.
 
-        Attempts to parse message JSON and post it to the internal API.
-        On success, acknowledges the message. On JSON decode errors,
-        rejects without requeue (discards malformed messages).
-        On network errors, rejects with requeue for retry.
+        Parses the message JSON and adds it to the current batch, which is
+        forwarded once it is full or has waited BATCH_MAX_WAIT_MS.
+        On JSON decode errors, rejects without requeue (discards malformed messages).
 
         Args:
-            channel: RabbitMQ channel
-            method: AMQP method frame
-            properties: AMQP message properties
-            body: Raw message body bytes
+            message: Incoming AMQP message
         """
+        logger.info("Received message from RabbitMQ")
+        # Lazy: the body is only formatted when DEBUG is enabled
+        logger.opt(lazy=True).debug("Message body: {}", lambda: message.body)
+
         try:
-            logger.info("Received message from RabbitMQ")
-            logger.debug(f"Message body: {body}")
-
-            # Parse the message
-            message_data: dict = json.loads(body)
-
-            # Send to internal API
-            logger.info(f"Sending data to API: {settings.API_URL}")
-            response: requests.Response = requests.post(
-                settings.API_URL,
-                json=message_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10,
-            )
-            response.raise_for_status()
+            message_data: dict = orjson.loads(message.body)
+        except orjson.JSONDecodeError as decode_error:
+            logger.error(f"Failed to decode message JSON: {decode_error}")
+            # Reject and don't requeue malformed messages
+            await message.reject(requeue=False)
+            return
 
-            logger.success(
-                f"Data successfully sent to API. Status: {response.status_code}"
+        self._batch.append((message, message_data))
+
+        if len(self._batch) >= settings.BATCH_MAX_SIZE:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                settings.BATCH_MAX_WAIT_MS / 1000, self._flush
             )
 
-            # Acknowledge the message
-            if channel.is_open:
-                channel.basic_ack(delivery_tag=method.delivery_tag)
-                logger.info("Message acknowledged")
+    def _flush(self) -> None:
+        """Hand the current batch to a background send so consuming continues."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
 
-        except json.JSONDecodeError as decode_error:
-            logger.error(f"Failed to decode message JSON: {decode_error}")
-            # Reject and don't requeue malformed messages
-            channel.basic_nack(
-                delivery_tag=method.delivery_tag, requeue=False
-            ) if channel.is_open else None
-
-        except requests.exceptions.RequestException as request_error:
-            logger.error(f"Failed to send data to API: {request_error}")
-            # Reject and requeue for retry
-            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
 
-        except Exception as unexpected_error:
-            logger.error(f"Unexpected error processing message: {unexpected_error}")
-            # Reject and requeue for retry
-            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        task = asyncio.create_task(self._send_batch(batch))
+        # Keep a reference until the send finishes so the task is not garbage collected
+        self._send_tasks.add(task)
+        task.add_done_callback(self._send_tasks.discard)
 
-    def start_consuming(self) -> None:
+    async def _send_batch(
+        self, batch: list[tuple[AbstractIncomingMessage, dict]]
+    ) -> None:
         """
-        Start consuming messages from the configured queue.
+        Forward a batch to the bulk API endpoint and settle its messages.
 
-        Processes one message at a time (prefetch_count=1) with manual
-        acknowledgment for reliability. Handles graceful shutdown on
-        KeyboardInterrupt.
+        Messages are settled one by one: batches finish out of order, so a
+        multiple=True ack could also cover messages of a batch that is still
+        in flight. A 207 names the records the database rejected; those are
+        dropped and the rest, already stored, are acked. A 4xx means the API
+        refused the batch before storing anything, so each message is sent on
+        its own to find the bad ones. Server and network errors requeue the
+        batch.
+
+        Args:
+            batch: Messages of the batch with their parsed bodies
+        """
+        async with self._in_flight:
+            try:
+                logger.info(
+                    f"Sending {len(batch)} record(s) to API: {settings.bulk_api_url}"
+                )
+                response: httpx.Response = await self._post(
+                    settings.bulk_api_url, [message_data for _, message_data in batch]
+                )
+
+                if response.is_client_error:
+                    logger.warning(
+                        f"API rejected the batch (status {response.status_code}), "
+                        f"sending {len(batch)} message(s) individually"
+                    )
+                    for message, message_data in batch:
+                        await self._send_one(message, message_data)
+                    return
+
+                response.raise_for_status()
+
+                failed: set[int] = set()
+                if response.status_code == 207:
+                    failed = set(orjson.loads(response.content)["failed"])
+                    logger.error(
+                        f"API rejected {len(failed)} of {len(batch)} record(s): "
+                        f"{sorted(failed)}"
+                    )
+                else:
+                    logger.success(
+                        f"Data successfully sent to API. Status: {response.status_code}"
+                    )
+
+                for index, (message, _) in enumerate(batch):
+                    if index in failed:
+                        # Retrying cannot fix a record the database refuses, so drop it
+                        await message.reject(requeue=False)
+                    else:
+                        await message.ack()
+                logger.info(f"{len(batch) - len(failed)} message(s) acknowledged")
+
+            except httpx.HTTPError as request_error:
+                logger.error(f"Failed to send data to API: {request_error}")
+                # Reject and requeue the batch for retry
+                for message, _ in batch:
+                    await message.nack(requeue=True)
+
+            except Exception as unexpected_error:
+                logger.error(f"Unexpected error processing batch: {unexpected_error}")
+                # Reject and requeue the batch for retry
+                for message, _ in batch:
+                    await message.nack(requeue=True)
+
+    async def _send_one(
+        self, message: AbstractIncomingMessage, message_data: dict
+    ) -> None:
         """
-        logger.info(f"Starting to consume messages from queue: {settings.QUEUE_NAME}")
+        Forward a single message to the API endpoint and settle it.
 
-        # Dont send messages if im processing something, im busy bro
-        self.channel.basic_qos(prefetch_count=1)
+        Acks on success, rejects without requeue when the API refuses the
+        record (4xx), and requeues on server or network errors.
 
-        # Set up consumer
-        self.channel.basic_consume(
-            queue=settings.QUEUE_NAME,
-            on_message_callback=self.callback,
-            auto_ack=False,  # Manual acknowledgment for reliability
+        Args:
+            message: AMQP message to settle
+            message_data: Parsed message body
+        """
+        try:
+            response: httpx.Response = await self._post(settings.API_URL, message_data)
+        except httpx.HTTPError as request_error:
+            logger.error(f"Failed to send data to API: {request_error}")
+            await message.nack(requeue=True)
+            return
+
+        if response.is_success:
+            await message.ack()
+        elif response.is_client_error:
+            logger.error(
+                f"API rejected message (status {response.status_code}): {response.text}"
+            )
+            # Retrying cannot fix a record the API refuses, so drop it
+            await message.reject(requeue=False)
+        else:
+            logger.error(f"API failed to store message (status {response.status_code})")
+            await message.nack(requeue=True)
+
+    async def _post(self, url: str, payload: dict | list[dict]) -> httpx.Response:
+        """POST a JSON payload to the API over the pooled client."""
+        return await self.http.post(
+            url,
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
         )
 
-        logger.info("Waiting for messages. To exit press CTRL+C")
-        try:
-            self.channel.start_consuming()
-        except KeyboardInterrupt:
-            logger.info("Stopping consumer...")
-            self.channel.stop_consuming()
-        finally:
-            self.connection.close()
-            logger.info("Connection closed")
+    async def start_consuming(self) -> None:
+        """
+        Start consuming messages from the configured queue.
+
+        Prefetches enough messages to fill MAX_IN_FLIGHT_BATCHES batches,
+        with manual acknowledgment for reliability. On shutdown, waits for
+        batches already being sent; messages still in an unsent batch are
+        redelivered by the broker once the connection closes.
+        """
+        logger.info("Connecting to RabbitMQ")
+        connection = await aio_pika.connect_robust(host=settings.RABBIT_HOST)
+        logger.success("Connected to RabbitMQ")
+
+        # One pooled HTTP client for all API calls, so connections are kept alive.
+        # Connection failures are retried; safe for POST since the API upserts.
+        async with (
+            connection,
+            httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(max_connections=settings.MAX_IN_FLIGHT_BATCHES),
+                transport=httpx.AsyncHTTPTransport(retries=3),
+            ) as self.http,
+        ):
+            channel = await connection.channel()
+            await channel.set_qos(
+                prefetch_count=settings.BATCH_MAX_SIZE * settings.MAX_IN_FLIGHT_BATCHES
+            )
+            queue = await channel.declare_queue(settings.QUEUE_NAME)
+
+            logger.info(
+                f"Starting to consume messages from queue: {settings.QUEUE_NAME}"
+            )
+            logger.info("Waiting for messages. To exit press CTRL+C")
+            try:
+                async with queue.iterator() as messages:
+                    async for message in messages:
+                        await self.callback(message)
+            finally:
+                logger.info("Stopping consumer...")
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                if self._send_tasks:
+                    await asyncio.gather(*self._send_tasks, return_exceptions=True)
+        logger.info("Connection closed")
 
 
 if __name__ == "__main__":
+    try:
+        # libuv-based event loop: cheaper socket handling than asyncio's default
+        from uvloop import run
+    except ImportError:  # uvloop does not support Windows
+        from asyncio import run
+
     consumer = MessageConsumer()
-    consumer.start_consuming()
+    try:
+        run(consumer.start_consuming())
+    except KeyboardInterrupt:
+        pass
@@ -1,9 +1,10 @@
-import json
-import time
+import asyncio
+import signal
+from collections.abc import Iterable
 from datetime import datetime, timedelta
 
+import httpx
 import pika  # rabbimq
-import requests
 from loguru import logger
 from tenacity import (
     retry,
@@ -12,7 +13,13 @@ from tenacity import (
     retry_if_exception_type,
 )
 
-from .config import settings
+from .config import get_settings
+
+# Shared by every publish: persistent JSON messages
+_MESSAGE_PROPERTIES = pika.BasicProperties(
+    content_type="application/json",
+    delivery_mode=pika.DeliveryMode.Persistent,
+)
 
 
 class ApiFetcher:
@@ -25,9 +32,20 @@ class ApiFetcher:
     """
 
     def __init__(self) -> None:
-        """Initialize RabbitMQ connection and channel."""
+        """Initialize RabbitMQ connection and channel, and the HTTP client."""
         self.connection, self.channel = self._connect_to_rabbitmq()
         self.timeout_seconds = 30
+        # Kept for the life of the fetcher so repeated fetches reuse the connection
+        self.http: httpx.Client = httpx.Client(
+            timeout=self.timeout_seconds,
+            limits=httpx.Limits(max_keepalive_connections=4),
+        )
+
+    def close(self) -> None:
+        """Close the HTTP client and the RabbitMQ connection."""
+        self.http.close()
+        if self.connection.is_open:
+            self.connection.close()
 
     @retry(
         stop=stop_after_attempt(30),
@@ -52,80 +70,164 @@ class ApiFetcher:
             pika.exceptions.AMQPConnectionError: If all connection attempts fail
         """
 
+        settings = get_settings()
         logger.info(
             "Attempting to connect to RabbitMQ at {host}:{port}",
             host=settings.RABBIT_HOST,
             port=5672,
         )
         connection: pika.BlockingConnection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=settings.RABBIT_HOST)
+            pika.ConnectionParameters(
+                host=settings.RABBIT_HOST,
+                # The connection idles for up to an hour between publishes, and a
+                # blocking connection only answers heartbeats inside pika calls
+                heartbeat=0,
+                # Fail a publish instead of hanging if the broker blocks publishers
+                blocked_connection_timeout=300,
+            )
         )
         channel = connection.channel()
         channel.queue_declare(queue=settings.QUEUE_NAME)
+        # Publisher confirms: basic_publish returns once the broker has the message
+        channel.confirm_delivery()
         logger.success("Successfully connected to RabbitMQ")
         return connection, channel
 
-    def get_data(self) -> requests.Response:
+    def get_data(self) -> httpx.Response:
         """
         Fetch current weather data from the OpenWeather API.
 
         Makes an HTTP GET request to the OpenWeather API with configured
-        latitude, longitude, and API key. Includes a timeout to prevent
-        indefinite hangs.
+        latitude, longitude, and API key over the fetcher's keep-alive
+        client. Includes a timeout to prevent indefinite hangs.
 
         Raises:
-            requests.HTTPError: If API returns an error status
-            requests.Timeout: If request exceeds timeout
-            requests.RequestException: For other request failures
+            httpx.HTTPStatusError: If API returns an error status
+            httpx.TimeoutException: If request exceeds timeout
+            httpx.HTTPError: For other request failures
         """
-        logger.info("About to fetch data from API")
-        response: requests.Response = requests.get(
-            settings.BASE_URL,
-            params={
-                "q": f"{settings.LAT},{settings.LON}",
-                "key": settings.API_KEY,
-            },
-            timeout=self.timeout_seconds,
-        )
-        logger.info("Received data from API")
+        response: httpx.Response = self.http.get(get_settings().weather_url)
         response.raise_for_status()
-        logger.success("Successfully fetched data from API")
+        # One line per fetch, with the round-trip time httpx measured
+        logger.success(
+            "Fetched data from API in {:.0f} ms",
+            response.elapsed.total_seconds() * 1000,
+        )
         return response
 
-    def send_data(self, data: requests.Response) -> None:
+    def send_data(self, data: httpx.Response) -> None:
         """
         Publish weather data to RabbitMQ queue.
 
-        Extracts JSON content from response and publishes as string
-        to the configured queue for asynchronous processing.
+        Publishes the raw JSON body of the response to the configured queue
+        for asynchronous processing, without parsing or re-serializing it.
+        The message is marked persistent and confirmed by the broker.
 
         Raises:
+            pika.exceptions.UnroutableError: If the broker could not route the message
+            pika.exceptions.NackError: If the broker rejected the message
             Exception: If publishing fails
         """
-        logger.info("About to send data to RabbitMQ")
-        logger.debug(f"Sample data: {data.json()[:10]}")
-        self.channel.basic_publish(
-            exchange="", routing_key=settings.QUEUE_NAME, body=json.dumps(data.json())
-        )
-        logger.success("Data sent to RabbitMQ")
+        self.send_many([data])
+
+    def send_many(self, responses: Iterable[httpx.Response]) -> None:
+        """
+        Publish several weather responses to RabbitMQ queue on one channel.
 
+        Each body is published as-is, marked persistent and confirmed by the
+        broker. Lets a driver fetch several locations and publish them together.
+
+        Args:
+            responses: Fetched API responses to publish
+
+        Raises:
+            pika.exceptions.UnroutableError: If the broker could not route a message
+            pika.exceptions.NackError: If the broker rejected a message
+            Exception: If publishing fails
+        """
+        # Bind per-call lookups to locals once instead of on every message
+        queue_name = get_settings().QUEUE_NAME
+        publish = self.channel.basic_publish
+        trace = logger.opt(lazy=True).trace
+        sent = 0
+        for data in responses:
+            # Lazy: the payload is only formatted when TRACE is enabled
+            trace("Payload: {}", lambda: data.content)
+            publish(
+                exchange="",
+                routing_key=queue_name,
+                body=data.content,
+                # Return (and raise) instead of dropping it if no queue is bound
+                mandatory=True,
+                properties=_MESSAGE_PROPERTIES,
+            )
+            sent += 1
+        logger.success("Sent {} message(s) to RabbitMQ", sent)
+
+
+async def _wait_for_shutdown(timeout: float) -> bool:
+    """
+    Sleep for up to timeout seconds, returning early on SIGTERM or SIGINT.
+
+    The handlers are only installed for the sleep itself: during the blocking
+    RabbitMQ connect, fetch and publish the signals keep their default
+    behaviour and stop the process right away.
+
+    Args:
+        timeout: Seconds to sleep
+
+    Returns:
+        True if a shutdown signal arrived before the timeout
+    """
+    shutdown = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    signals = (signal.SIGTERM, signal.SIGINT)
+    for signum in signals:
+        loop.add_signal_handler(signum, shutdown.set)
+    try:
+        await asyncio.wait_for(shutdown.wait(), timeout=timeout)
+        return True
+    except TimeoutError:
+        return False
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+
+
+async def main() -> None:
+    """
+    Fetch and publish weather data every hour until SIGTERM or SIGINT.
+
+    The wait until the next full hour ends as soon as a shutdown signal
+    arrives, so the process exits promptly instead of finishing its sleep.
+    """
+    # asyncio.run defers the first Ctrl+C to the next await; raise it inside blocking calls
+    signal.signal(signal.SIGINT, signal.default_int_handler)
 
-if __name__ == "__main__":
     api_fetcher = ApiFetcher()
-    # Fetch data every hour, then sleep until the next "full" hour
-    while True:
-        try:
-            api_fetcher.send_data(api_fetcher.get_data())
-        except Exception as e:
-            logger.error(f"An error occurred: {e}")
-
-        now = datetime.now()
-        next_hour = (now + timedelta(hours=1)).replace(
-            minute=0, second=0, microsecond=0
-        )
-        seconds_to_sleep = (next_hour - now).total_seconds()
+    try:
+        # Fetch data every hour, then sleep until the next "full" hour
+        while True:
+            try:
+                api_fetcher.send_data(api_fetcher.get_data())
+            except Exception as e:
+                logger.error(f"An error occurred: {e}")
+
+            now = datetime.now()
+            next_hour = (now + timedelta(hours=1)).replace(
+                minute=0, second=0, microsecond=0
+            )
+            seconds_to_sleep = (next_hour - now).total_seconds()
+
+            logger.info(
+                f"Sleeping for {seconds_to_sleep:.2f} seconds until {next_hour.strftime('%Y-%m-%d %H:%M:%S')}..."
+            )
+            if await _wait_for_shutdown(seconds_to_sleep):
+                break
+    finally:
+        api_fetcher.close()
+        logger.info("Producer stopped")
 
-        logger.info(
-            f"Sleeping for {seconds_to_sleep:.2f} seconds until {next_hour.strftime('%Y-%m-%d %H:%M:%S')}..."
-        )
-        time.sleep(seconds_to_sleep)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,24 +1,23 @@
 """Configuration for the weather data producer service."""
 
-from pydantic_settings import BaseSettings
-
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import urlencode
 
+# .env at the project root, computed once at import
+# config.py -> producer_app -> producer -> src -> root; images install the package
+# closer to / (e.g. /app/producer_app), so stop at the filesystem root instead
+_PARENTS = Path(__file__).parents
+_ENV_PATH: Path = _PARENTS[min(3, len(_PARENTS) - 1)] / ".env"
+# Without a .env (e.g. containers configured purely via env vars) skip dotenv parsing
+_ENV_FILE: Path | None = _ENV_PATH if _ENV_PATH.is_file() else None
 
-def _get_project_root() -> Path:
-    """
-    Calculate the project root directory.
-
-    Assumes this file is at src/producer/producer_app/config.py.
-    Navigates up 3 levels to reach the project root.
 
-    """
-    current_file_dir = Path(__file__).parent.resolve()
-    # producer_app -> producer -> src -> root
-    return current_file_dir.parent.parent.parent
-
-
-class Settings(BaseSettings):
+@dataclass(slots=True, frozen=True)
+class Settings:
     """
     Producer service configuration.
 
@@ -40,10 +39,72 @@ class Settings(BaseSettings):
 
     RABBIT_HOST: str = "localhost"  # change in docker env
 
-    class Config:
-        env_file = str(_get_project_root() / ".env")
-        env_file_encoding = "utf-8"
-        extra = "ignore"
+    # Full request URL, built once from the fields above
+    weather_url: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        query = urlencode({"q": f"{self.LAT},{self.LON}", "key": self.API_KEY})
+        # Frozen dataclass: set the derived field through object.__setattr__
+        object.__setattr__(self, "weather_url", f"{self.BASE_URL}?{query}")
+
+
+def _environ() -> Mapping[str, str | None]:
+    """
+    Return the variables to read settings from.
+
+    The process environment wins over .env, which is only parsed when
+    API_KEY is not already set (e.g. local runs outside docker compose).
+    """
+    if "API_KEY" in os.environ or _ENV_FILE is None:
+        return os.environ
+
+    from dotenv import dotenv_values
+
+    return {**dotenv_values(_ENV_FILE), **os.environ}
+
+
+def _load() -> Settings:
+    """
+    Build Settings from the environment.
+
+    Raises:
+        RuntimeError: If API_KEY is set neither in the environment nor in .env
+    """
+    env = _environ()
+    values: dict[str, object] = {}
+    for settings_field in fields(Settings):
+        if not settings_field.init:
+            continue
+        raw = env.get(settings_field.name)
+        if raw:
+            # Field types are plain str/float, so the annotation doubles as the cast
+            values[settings_field.name] = settings_field.type(raw)
+    if "API_KEY" not in values:
+        raise RuntimeError("API_KEY must be set in the environment or in .env")
+    # Unset fields fall back to the dataclass defaults
+    return Settings(**values)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the process-wide settings instance.
+
+    Constructed on first call and cached afterwards, so the .env file is
+    parsed once. Tests that change the environment can call
+    ``get_settings.cache_clear()`` to force a reload.
+
+    Returns:
+        Cached Settings instance
+    """
+    return _load()
+
+
+settings: Settings
 
 
-settings: Settings = Settings()
+def __getattr__(name: str) -> Settings:
+    """Build ``settings`` on first access (PEP 562) rather than at import."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")